@@ -0,0 +1,186 @@
+import time
+import heapq
+import asyncio
+import logging
+from metrics import timed
+
+# Discord rejects messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+# Lower numbers are sent first
+PRIORITY_RESTOCKED = 0
+PRIORITY_NEW = 1
+PRIORITY_UPDATED = 2
+PRIORITY_REMOVED = 3
+PRIORITY_CATALOG = 4
+
+# Changes to these fields alone don't warrant an alert (restocks are reported separately)
+QUIET_FIELDS = {'quantity_available'}
+
+def format_diff_alerts(diff):
+    """
+    Turn an InventoryDiff into alert lines.
+
+    Returns:
+        list: (line, priority) tuples
+    """
+    alerts = []
+    for entry in diff.added:
+        alerts.append((f"New data added: {entry}", PRIORITY_NEW))
+    for entry in diff.restocked:
+        alerts.append((f"Restocked: {entry}", PRIORITY_RESTOCKED))
+    for change in diff.changed:
+        if set(change.fields) <= QUIET_FIELDS:
+            continue
+        details = ", ".join(f"{field}: {change.old.get(field)} -> {change.new.get(field)}" for field in change.fields)
+        alerts.append((f"Updated {change.new.get('name')}: {details}", PRIORITY_UPDATED))
+    for entry in diff.removed:
+        alerts.append((f"No longer listed: {entry.get('name')}", PRIORITY_REMOVED))
+    return alerts
+
+class TokenBucket:
+    """Allow `rate` sends per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def pack_lines(lines, limit=MAX_MESSAGE_LENGTH):
+    """
+    Pack lines into as few messages as possible, keeping their order and each message within limit.
+    Lines longer than the limit are split.
+    """
+    messages = []
+    current = ""
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+class AlertDispatcher:
+    """
+    Collects alert lines, then sends them in as few messages as possible to every channel.
+
+    Lines are ordered by priority so restocks and new bottles lead. Each channel has its own
+    token bucket (Discord allows roughly 5 messages per 5 seconds per channel) and channels
+    are sent to concurrently, under a shared bucket for the global limit.
+    """
+
+    def __init__(self, channels, channel_rate=1.0, channel_burst=5, global_rate=40.0):
+        """
+        Args:
+            channels (list): Objects with an async send(content) method (Discord channels)
+            channel_rate (float): Sustained messages per second per channel
+            channel_burst (int): Messages a channel may send back to back
+            global_rate (float): Messages per second across all channels
+        """
+        self.channels = list(channels)
+        self.buckets = [TokenBucket(channel_rate, channel_burst) for _ in self.channels]
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._pending = []
+        self._sequence = 0
+
+    def add(self, line, priority=PRIORITY_NEW):
+        """Queue a line for the next flush."""
+        heapq.heappush(self._pending, (priority, self._sequence, line))
+        self._sequence += 1
+
+    async def flush(self):
+        """
+        Send everything queued so far.
+
+        Returns:
+            int: Number of messages sent per channel
+        """
+        lines = [heapq.heappop(self._pending)[2] for _ in range(len(self._pending))]
+        if not lines:
+            return 0
+
+        messages = pack_lines(lines)
+        await asyncio.gather(*(
+            self._send_messages(channel, bucket, messages)
+            for channel, bucket in zip(self.channels, self.buckets)
+        ))
+        return len(messages)
+
+    async def _send_messages(self, channel, bucket, messages):
+        for message in messages:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                with timed('channel_send'):
+                    await channel.send(message)
+            except Exception as e:
+                logging.error(f"Failed to send alert to channel {getattr(channel, 'id', channel)}: {e}")
+
+class MockChannel:
+    """Stand-in for a Discord channel that records messages after a simulated round-trip."""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content):
+        await asyncio.sleep(self.latency)
+        self.sent.append(content)
+
+async def benchmark_dispatcher(entries=100, channels=3, latency=0.02):
+    """
+    Compare one-send-per-entry against the dispatcher on mock channels.
+
+    Returns:
+        dict: Elapsed seconds, messages sent and entries delivered per second for both approaches
+    """
+    lines = [f"New data added: {{'name': 'Bottle {i}', 'price': '${i}.99'}}" for i in range(entries)]
+
+    serial_channels = [MockChannel(latency) for _ in range(channels)]
+    start = time.perf_counter()
+    for channel in serial_channels:
+        for line in lines:
+            await channel.send(line)
+    serial_elapsed = time.perf_counter() - start
+
+    mock_channels = [MockChannel(latency) for _ in range(channels)]
+    dispatcher = AlertDispatcher(mock_channels)
+    for line in lines:
+        dispatcher.add(line)
+    start = time.perf_counter()
+    messages = await dispatcher.flush()
+    dispatched_elapsed = time.perf_counter() - start
+
+    return {
+        'serial_seconds': serial_elapsed,
+        'serial_messages': entries * channels,
+        'serial_entries_per_second': entries * channels / serial_elapsed,
+        'dispatcher_seconds': dispatched_elapsed,
+        'dispatcher_messages': messages * channels,
+        'dispatcher_entries_per_second': entries * channels / dispatched_elapsed,
+    }
+
+if __name__ == "__main__":
+    for name, value in asyncio.run(benchmark_dispatcher()).items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
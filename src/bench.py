@@ -0,0 +1,259 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+from html_parser import ParseCache, parse_whiskey_html, compare_parser_engines, engine_available, PARSER_ENGINES
+from inventory import InventoryStore
+from identity import ProductResolver
+from alert_dispatcher import format_diff_alerts, pack_lines
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bench_baseline.json')
+SYNTHETIC_SIZES = (10, 100, 1000)
+
+CARD_TEMPLATE = """<div class="card product-card"><div class="card__body">
+<h4 class="card_title_name">{name}</h4>
+<span class="card__price-amount">${price}</span>
+<p class="online-available-label">Available Online</p>
+<div class="availability-label"><p>In {stores} stores</p></div>
+<div class="availability-info"><p>{quantity} available</p></div>
+<p class="limited-text">Limit {limit} per customer</p>
+</div></div>
+"""
+
+def make_synthetic_page(cards, seed=0, quantity_offset=0):
+    """
+    Build a release page with the given number of cards. quantity_offset changes the quantity of
+    the first card only, to simulate a single-card update.
+    """
+    rng = random.Random(seed)
+    body = []
+    for index in range(cards):
+        body.append(CARD_TEMPLATE.format(
+            name=f"Synthetic Bourbon {index} Year {rng.randint(4, 23)}",
+            price=f"{rng.randint(30, 2500)}.99",
+            stores=rng.randint(0, 40),
+            quantity=rng.randint(0, 300) + (quantity_offset if index == 0 else 0),
+            limit=rng.randint(1, 3)
+        ))
+    return (
+        "<html><head><title>Whiskey Release</title></head><body><div id=\"root\"><header>nav</header>"
+        f"<section class=\"listing\">{''.join(body)}</section><footer>rendered {seed}</footer></div></body></html>"
+    )
+
+def load_corpus(corpus_dir=None):
+    """
+    Pages to benchmark: every saved .html file in corpus_dir (data/ by default) plus synthetic
+    pages at each of SYNTHETIC_SIZES.
+
+    Returns:
+        dict: page name -> (html, changed html with one card updated)
+    """
+    corpus_dir = corpus_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        # Changing the first quantity gives a realistic one-card update on recorded pages too
+        changed = html_content.replace(' available</p>', ' available </p>', 1)
+        pages[os.path.basename(path)] = (html_content, changed)
+    for size in SYNTHETIC_SIZES:
+        pages[f'synthetic-{size}'] = (make_synthetic_page(size), make_synthetic_page(size, quantity_offset=1))
+    return pages
+
+def legacy_new_entries(last_known_data, current_data):
+    """The original check_for_updates diff, kept as a reference point."""
+    last_known_set = {tuple(sorted(entry.items())) for entry in last_known_data}
+    current_set = {tuple(sorted(entry.items())) for entry in current_data}
+    return current_set - last_known_set
+
+def measure(function, repeat):
+    """
+    Run function repeat times.
+
+    Returns:
+        dict: p50/p95/p99 latency (seconds), calls per second and peak traced memory (bytes)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    # Memory is traced on a separate run, tracemalloc would skew the timings
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings.sort()
+    percentile = lambda p: timings[min(len(timings) - 1, int(p * len(timings)))]
+    return {
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'per_second': len(timings) / sum(timings) if sum(timings) else float('inf'),
+        'peak_bytes': peak,
+    }
+
+def bench_page(html_content, changed_html, repeat):
+    """Benchmark the parse, diff and alert formatting paths on one page."""
+    results = {}
+
+    results['parse_cold'] = measure(
+        lambda: parse_whiskey_html(html_content, cache=ParseCache(), force=True, save_json=False), repeat
+    )
+    for engine in PARSER_ENGINES[1:]:
+        if engine_available(engine):
+            results[f'parse_cold_{engine}'] = measure(
+                lambda: parse_whiskey_html(html_content, cache=ParseCache(), force=True, engine=engine, save_json=False), repeat
+            )
+
+    warm = ParseCache()
+    parse_whiskey_html(html_content, cache=warm, save_json=False)
+    results['parse_unchanged'] = measure(lambda: parse_whiskey_html(html_content, cache=warm, save_json=False), repeat)
+
+    def parse_one_card_changed():
+        parse_whiskey_html(changed_html, cache=warm, save_json=False)
+        parse_whiskey_html(html_content, cache=warm, save_json=False)
+    results['parse_one_card_changed'] = measure(parse_one_card_changed, repeat)
+
+    before = parse_whiskey_html(html_content, cache=ParseCache(), save_json=False)
+    after = parse_whiskey_html(changed_html, cache=ParseCache(), save_json=False)
+    results['diff_legacy'] = measure(lambda: legacy_new_entries(before, after), repeat)
+
+    # Name resolution is memoized for the life of the bot, so the steady state reuses a warm resolver
+    resolver = ProductResolver()
+    def inventory_diff():
+        store = InventoryStore(resolver)
+        store.apply_snapshot(before)
+        return store.apply_snapshot(after)
+    results['diff_inventory'] = measure(inventory_diff, repeat)
+
+    def resolve_names_cold():
+        cold = ProductResolver()
+        return [cold.resolve(entry['name']) for entry in after]
+    results['resolve_names_cold'] = measure(resolve_names_cold, repeat)
+
+    everything_new = InventoryStore().apply_snapshot(after)
+    results['alert_format'] = measure(lambda: pack_lines([line for line, _ in format_diff_alerts(everything_new)]), repeat)
+    return results
+
+def bench_fetch(pages, repeat):
+    """Time the HTTP fast path end to end against a local fixture server (no network needed)."""
+    import tempfile
+    from fixture_server import start_fixture_server
+    from fetchers import HttpFetcher
+    from scraper import WhiskeyScraper
+
+    results = {}
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        for name, (html_content, _) in pages.items():
+            with open(os.path.join(fixture_dir, f'{name}.html'), 'w', encoding='utf-8') as f:
+                f.write(html_content)
+
+        server, base_url = start_fixture_server(fixture_dir)
+        try:
+            for name in pages:
+                url = f'{base_url}/{name}.html'
+                fetcher = HttpFetcher(url=url)
+                scraper = WhiskeyScraper(fetchers=[fetcher])
+                cache = ParseCache()
+                results[name] = {
+                    'http_fetch': measure(fetcher.fetch, repeat),
+                    'fetch_and_parse': measure(
+                        lambda: parse_whiskey_html(scraper._fetch_fast_path(url), cache=cache, save_json=False), repeat
+                    ),
+                }
+                fetcher.close()
+        finally:
+            server.shutdown()
+    return results
+
+def bench_startup(repeat, commands=('run', 'bot', 'scraper', 'parse-once')):
+    """Time `main.py --check-startup <command>` end to end (interpreter start included) for each command."""
+    import subprocess
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    env = dict(os.environ, METRICS_PORT='0', METRICS_TRACE_FILE='')
+
+    def start(command):
+        subprocess.run([sys.executable, main_path, '--check-startup', command], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return {command: measure(lambda: start(command), repeat) for command in commands}
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    List every benchmark whose p50 got slower than tolerance times its baseline.
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for group, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            reference = baseline.get(group, {}).get(name)
+            if reference and stats['p50'] > reference['p50'] * tolerance:
+                regressions.append(
+                    f"{group}/{name}: p50 {stats['p50'] * 1000:.3f}ms vs baseline {reference['p50'] * 1000:.3f}ms"
+                )
+    return regressions
+
+def print_results(results):
+    print(f"{'benchmark':<48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>12} {'peak KiB':>10}")
+    for group, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            print(f"{group + '/' + name:<48} {stats['p50'] * 1000:>10.3f} {stats['p95'] * 1000:>10.3f} "
+                  f"{stats['p99'] * 1000:>10.3f} {stats['per_second']:>12.1f} {stats['peak_bytes'] / 1024:>10.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, diffing and alerting on recorded and synthetic pages.")
+    parser.add_argument('--corpus', help="Directory of recorded .html pages (defaults to data/)")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per benchmark")
+    parser.add_argument('--serve', action='store_true', help="Also time the HTTP fetch path against a local fixture server")
+    parser.add_argument('--startup', action='store_true', help="Also time how long each main.py command takes to start")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Allowed slowdown factor before failing")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)  # Parser info logs would dominate the timings
+    pages = load_corpus(args.corpus)
+
+    # A faster engine that extracts different data isn't a speedup
+    mismatched = [
+        f"{name}/{engine}" for name, (html_content, _) in pages.items()
+        for engine, same in compare_parser_engines(html_content).items() if not same
+    ]
+
+    results = {name: bench_page(html_content, changed, args.repeat) for name, (html_content, changed) in pages.items()}
+    if args.serve:
+        results.update({f'fetch/{name}': stats for name, stats in bench_fetch(pages, args.repeat).items()})
+    if args.startup:
+        results['startup'] = bench_startup(min(args.repeat, 5))
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    failed = False
+    if mismatched:
+        print(f"Parser engines disagree with html.parser on: {', '.join(mismatched)}")
+        failed = True
+
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
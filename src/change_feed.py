@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+class ChangeFeed:
+    """
+    In-process channel that hands parse results from the scraper thread to the bot's event loop.
+
+    The scraper calls publish_snapshot() from its own thread; the bot awaits get() and so
+    sleeps until something actually changed.
+    """
+
+    def __init__(self, loop):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop): Event loop the bot runs on
+        """
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.last_snapshot = None  # Only touched from the publishing thread
+
+    def publish_snapshot(self, whiskey_data):
+        """
+        Queue a parse result for the bot if it differs from the last one. Safe to call from any thread.
+
+        Args:
+            whiskey_data (list): whiskey_info dicts returned by parse_whiskey_html
+        """
+        # parse_whiskey_html returns the very same list when the page didn't change
+        if whiskey_data is None or whiskey_data is self.last_snapshot or whiskey_data == self.last_snapshot:
+            return
+        self.last_snapshot = whiskey_data
+
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, whiskey_data)
+        except RuntimeError as e:
+            logging.error(f"Could not hand update to the bot, event loop is closed: {e}")
+
+    async def get(self):
+        """Wait for the next changed snapshot."""
+        return await self.queue.get()
@@ -0,0 +1,471 @@
+import hmac
+import json
+import time
+import zlib
+import queue
+import bisect
+import socket
+import struct
+import hashlib
+import logging
+import threading
+import socketserver
+from supervisor import Backoff
+
+# Frame: 4-byte payload length, 1-byte flags, then a JSON list of messages (zlib-compressed if flagged)
+FRAME_HEADER = struct.Struct('>IB')
+FLAG_ZLIB = 1
+COMPRESS_ABOVE = 512  # Bytes; smaller payloads aren't worth compressing
+MAX_FRAME = 64 * 1024 * 1024
+
+DEFAULT_BROKER_PORT = 7400
+LOOPBACK_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+
+def parse_address(address, default_port=DEFAULT_BROKER_PORT):
+    """Turn "host:port" (or just "host") into a (host, port) tuple."""
+    host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+    return host or '127.0.0.1', int(port or default_port)
+
+def encode_batch(messages):
+    """Encode a list of message dicts as one frame."""
+    payload = json.dumps(messages, separators=(',', ':')).encode('utf-8')
+    flags = 0
+    if len(payload) > COMPRESS_ABOVE:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    return FRAME_HEADER.pack(len(payload), flags) + payload
+
+def read_batch(stream):
+    """Read one frame from a binary file object. Returns its list of messages, or None at EOF."""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    length, flags = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes is too large")
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+class Connection:
+    """A socket that several threads can send batches on."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.stream = sock.makefile('rb')
+        self.send_lock = threading.Lock()
+
+    def send(self, messages):
+        frame = encode_batch(messages)
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def receive(self):
+        return read_batch(self.stream)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+def hello(role, secret=None, **fields):
+    """First message a client sends the broker."""
+    message = {'type': 'hello', 'role': role, **fields}
+    if secret:
+        message['secret'] = secret
+    return message
+
+def _ring_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class HashRing:
+    """
+    Consistent hashing of target names onto nodes. Each node gets `replicas` points on the ring,
+    so when a node joins or leaves only the targets next to its points move.
+    """
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self.points = sorted((_ring_hash(f'{node}#{index}'), node) for node in nodes for index in range(replicas))
+        self.hashes = [point for point, _ in self.points]
+
+    def node_for(self, key):
+        """Node a key belongs to, or None if the ring is empty."""
+        if not self.points:
+            return None
+        index = bisect.bisect(self.hashes, _ring_hash(key)) % len(self.points)
+        return self.points[index][1]
+
+    def assign(self, keys):
+        """Map every key to its node. Returns {node: [keys]}."""
+        assignments = {}
+        for key in keys:
+            node = self.node_for(key)
+            if node is not None:
+                assignments.setdefault(node, []).append(key)
+        return assignments
+
+class Broker:
+    """
+    Coordinator and message hub for sharded scraping.
+
+    Every client's hello must carry the shared secret, which is required unless the broker only
+    listens on loopback; the traffic itself isn't encrypted, so off a single host the broker
+    belongs on a private network or VPN.
+
+    Scraper nodes connect, say hello with their node id and are assigned targets by consistent
+    hashing; they then send each target's parse result whenever it changes, batched with their
+    heartbeats. A node that disconnects or misses heartbeats is dropped and its targets are
+    reassigned to the rest. The broker merges the latest result of every target (in target
+    order, like ScrapeScheduler.merge_results) and streams the merged snapshot to every
+    connected bot.
+    """
+
+    def __init__(self, targets, host='127.0.0.1', port=DEFAULT_BROKER_PORT, heartbeat_timeout=20, on_snapshot=None,
+                 secret=None):
+        """
+        Args:
+            targets (list): ScrapeTargets to spread over the nodes
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 picks a free one
+            heartbeat_timeout (float): Seconds of silence before a node is considered dead
+            on_snapshot (callable): Called with each new merged snapshot (e.g. to save it or record history)
+            secret (str): Shared secret nodes and bots must send in their hello. Only optional on a
+                loopback host; anywhere else a missing secret raises ValueError
+        """
+        if not secret and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"A broker listening on {host} needs a secret, without one any client could push snapshots")
+        self.targets = {target.name: target for target in targets}
+        self.heartbeat_timeout = heartbeat_timeout
+        self.on_snapshot = on_snapshot
+        self.secret = secret
+
+        self.lock = threading.Lock()
+        self.nodes = {}  # node id -> Connection
+        self.last_seen = {}  # node id -> monotonic time of its last message
+        self.bots = set()
+        self.owners = {}  # target name -> node id
+        self.results = {}  # target name -> latest whiskey data
+        self.snapshot = None
+
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                broker._serve(Connection(self.request))
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self.address = self.server.server_address
+
+    def start(self):
+        """Serve in background threads. Returns self."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._reap_dead_nodes, daemon=True).start()
+        logging.info(f"Broker listening on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        with self.lock:
+            connections = list(self.nodes.values()) + list(self.bots)
+        for connection in connections:
+            connection.close()
+
+    def _serve(self, connection):
+        node_id = None
+        try:
+            hello = connection.receive()
+            if not hello or hello[0].get('type') != 'hello':
+                return
+            if self.secret and not hmac.compare_digest(str(hello[0].get('secret', '')).encode('utf-8'), self.secret.encode('utf-8')):
+                logging.warning(f"Rejected a client without the broker secret from {connection.sock.getpeername()[0]}")
+                return
+            role = hello[0].get('role')
+            if role == 'bot':
+                self._add_bot(connection)
+            elif role == 'node':
+                node_id = hello[0]['node']
+                self._add_node(node_id, connection)
+            else:
+                return
+
+            while True:
+                batch = connection.receive()
+                if batch is None:
+                    break
+                if node_id is not None:
+                    self._handle_node_batch(node_id, connection, batch)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Connection from {node_id or 'client'} failed: {e}")
+        finally:
+            if node_id is not None:
+                self._remove_node(node_id, connection)
+            else:
+                with self.lock:
+                    self.bots.discard(connection)
+            connection.close()
+
+    def _add_bot(self, connection):
+        with self.lock:
+            self.bots.add(connection)
+            snapshot = self.snapshot
+        logging.info("Bot subscribed to the merged snapshot stream")
+        if snapshot is not None:
+            connection.send([{'type': 'snapshot', 'data': snapshot}])
+
+    def _add_node(self, node_id, connection):
+        with self.lock:
+            previous = self.nodes.get(node_id)
+            self.nodes[node_id] = connection
+            self.last_seen[node_id] = time.monotonic()
+        if previous is not None:
+            previous.close()  # The node reconnected, drop the stale connection
+        logging.info(f"Node {node_id} joined")
+        self._rebalance(always_notify=node_id)  # A reconnecting node needs its targets again even if they didn't move
+
+    def _remove_node(self, node_id, connection=None):
+        with self.lock:
+            if node_id not in self.nodes or (connection is not None and self.nodes[node_id] is not connection):
+                return
+            self.nodes.pop(node_id).close()
+            self.last_seen.pop(node_id, None)
+        logging.warning(f"Node {node_id} left, reassigning its targets")
+        self._rebalance()
+
+    def _reap_dead_nodes(self):
+        while True:
+            time.sleep(1)
+            now = time.monotonic()
+            with self.lock:
+                dead = [node_id for node_id, seen in self.last_seen.items() if now - seen > self.heartbeat_timeout]
+            for node_id in dead:
+                logging.warning(f"Node {node_id} missed its heartbeats")
+                self._remove_node(node_id)
+
+    def _rebalance(self, always_notify=None):
+        """Reassign targets over the live nodes and tell every node whose targets changed."""
+        with self.lock:
+            ring = HashRing(self.nodes)
+            assignments = ring.assign(self.targets)
+            owners = {name: node_id for node_id, names in assignments.items() for name in names}
+            changed = {node_id for name, node_id in owners.items() if self.owners.get(name) != node_id}
+            changed |= {node_id for name, node_id in self.owners.items() if owners.get(name) != node_id and node_id in self.nodes}
+            if always_notify in self.nodes:
+                changed.add(always_notify)
+            self.owners = owners
+            messages = {
+                node_id: {'type': 'assign', 'targets': [list(self.targets[name]) for name in assignments.get(node_id, [])]}
+                for node_id in changed
+            }
+            connections = {node_id: self.nodes[node_id] for node_id in changed}
+
+        for node_id, message in messages.items():
+            logging.info(f"Assigning {[target[0] for target in message['targets']]} to node {node_id}")
+            try:
+                connections[node_id].send([message])
+            except OSError as e:
+                logging.warning(f"Could not send assignment to node {node_id}: {e}")
+
+    def _handle_node_batch(self, node_id, connection, batch):
+        changed = False
+        with self.lock:
+            if self.nodes.get(node_id) is not connection:
+                return
+            self.last_seen[node_id] = time.monotonic()
+            for message in batch:
+                if message.get('type') != 'result':
+                    continue
+                # Results from a node that no longer owns the target are stale
+                if self.owners.get(message['target']) != node_id:
+                    continue
+                self.results[message['target']] = message['data']
+                changed = True
+        if changed:
+            self._publish_merged()
+
+    def _publish_merged(self):
+        with self.lock:
+            merged = []
+            for name in self.targets:
+                merged.extend(self.results.get(name) or [])
+            if merged == self.snapshot:
+                return
+            self.snapshot = merged
+            bots = list(self.bots)
+
+        logging.info(f"Merged {len(merged)} whiskey items from {len(self.results)} targets")
+        if self.on_snapshot:
+            self.on_snapshot(merged)
+        for bot in bots:
+            try:
+                bot.send([{'type': 'snapshot', 'data': merged}])
+            except OSError as e:
+                logging.warning(f"Could not send snapshot to a bot: {e}")
+
+class ScraperNode:
+    """
+    A scraper process in sharded mode: scrapes whatever targets the broker assigns it and sends
+    each target's result back. Results are queued and sent in batches (only the latest result
+    per target survives a batch), together with a heartbeat every heartbeat_interval.
+    """
+
+    def __init__(self, address, node_id, session_factory, batch_interval=0.5, heartbeat_interval=5, secret=None,
+                 **scheduler_options):
+        """
+        Args:
+            address (tuple): Broker (host, port)
+            node_id (str): Stable name of this node, e.g. its region
+            session_factory (callable): Passed to ScrapeScheduler (e.g. FetchSupervisor.session)
+            batch_interval (float): Seconds to collect results before sending them
+            heartbeat_interval (float): Seconds between heartbeats when there's nothing to send
+            secret (str): The broker's shared secret
+            scheduler_options: Extra ScrapeScheduler arguments (workers, policy, engine, ...)
+        """
+        self.address = address
+        self.node_id = node_id
+        self.session_factory = session_factory
+        self.batch_interval = batch_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.secret = secret
+        self.scheduler_options = scheduler_options
+        self.outbox = queue.Queue()
+        self.scheduler_thread = None
+        self.scheduler_stop = None
+
+    def publish_result(self, target, whiskey_data):
+        """Queue a target's new result for the next batch (ScrapeScheduler on_result hook)."""
+        self.outbox.put({'type': 'result', 'target': target.name, 'data': whiskey_data})
+
+    def run(self, stop_event=None):
+        """Stay connected to the broker (reconnecting with backoff) until stop_event is set."""
+        stop_event = stop_event or threading.Event()
+        backoff = Backoff(base=1, cap=60)
+        attempts = 0
+        while not stop_event.is_set():
+            try:
+                connection = Connection(socket.create_connection(self.address, timeout=10))
+                connection.sock.settimeout(None)
+            except OSError as e:
+                delay = backoff.delay(attempts)
+                attempts += 1
+                logging.warning(f"Could not reach broker at {self.address}: {e}, retrying in {delay:.1f}s")
+                stop_event.wait(delay)
+                continue
+
+            attempts = 0
+            logging.info(f"Node {self.node_id} connected to broker at {self.address}")
+            self._session(connection, stop_event)
+            self._reschedule([])  # Whatever we held is being reassigned while we're away
+
+    def _session(self, connection, stop_event):
+        disconnected = threading.Event()
+        sender = threading.Thread(target=self._send_batches, args=(connection, stop_event, disconnected), daemon=True)
+        try:
+            connection.send([hello('node', self.secret, node=self.node_id)])
+            sender.start()
+            while not stop_event.is_set():
+                batch = connection.receive()
+                if batch is None:
+                    break
+                for message in batch:
+                    if message.get('type') == 'assign':
+                        self._reschedule(message['targets'])
+        except (OSError, ValueError) as e:
+            logging.warning(f"Lost connection to broker: {e}")
+        finally:
+            disconnected.set()
+            connection.close()
+            if sender.is_alive():
+                sender.join()
+
+    def _send_batches(self, connection, stop_event, disconnected):
+        last_sent = 0.0
+        while not (stop_event.is_set() or disconnected.is_set()):
+            disconnected.wait(self.batch_interval)
+            latest = {}
+            while True:
+                try:
+                    message = self.outbox.get_nowait()
+                except queue.Empty:
+                    break
+                latest[message['target']] = message
+
+            batch = list(latest.values())
+            if not batch and time.monotonic() - last_sent < self.heartbeat_interval:
+                continue
+            batch.append({'type': 'heartbeat'})
+            try:
+                connection.send(batch)
+            except OSError:
+                # Put the results back so they're sent after reconnecting
+                for message in latest.values():
+                    self.outbox.put(message)
+                return
+            last_sent = time.monotonic()
+
+    def _reschedule(self, targets):
+        """Stop scraping the old assignment and start on the new one ([name, url, interval, jitter] lists)."""
+        # Imported here so the broker and bot subscriber don't load the parser
+        from scheduler import ScrapeScheduler, ScrapeTarget
+
+        if self.scheduler_thread is not None:
+            self.scheduler_stop.set()
+            self.scheduler_thread.join()
+            self.scheduler_thread = None
+        if not targets:
+            logging.info(f"Node {self.node_id} has no targets")
+            return
+
+        targets = [ScrapeTarget(*target) for target in targets]
+        logging.info(f"Node {self.node_id} now scraping {[target.name for target in targets]}")
+        scheduler = ScrapeScheduler(
+            targets,
+            self.session_factory,
+            on_result=self.publish_result,
+            merge=False,
+            **self.scheduler_options
+        )
+        self.scheduler_stop = threading.Event()
+        self.scheduler_thread = threading.Thread(target=scheduler.run, args=(self.scheduler_stop,), daemon=True)
+        self.scheduler_thread.start()
+
+def subscribe_snapshots(address, on_snapshot, stop_event=None, secret=None):
+    """
+    Receive merged snapshots from the broker (reconnecting with backoff) and hand each one to
+    on_snapshot, e.g. ChangeFeed.publish_snapshot. Runs until stop_event is set (checked
+    between messages, so meant for a daemon thread). secret is the broker's shared secret.
+    """
+    stop_event = stop_event or threading.Event()
+    backoff = Backoff(base=1, cap=60)
+    attempts = 0
+    while not stop_event.is_set():
+        try:
+            connection = Connection(socket.create_connection(address, timeout=10))
+            connection.sock.settimeout(None)
+            connection.send([hello('bot', secret)])
+            attempts = 0
+            logging.info(f"Subscribed to broker at {address}")
+            while not stop_event.is_set():
+                batch = connection.receive()
+                if batch is None:
+                    break
+                for message in batch:
+                    if message.get('type') == 'snapshot':
+                        on_snapshot(message['data'])
+            connection.close()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Broker connection at {address} failed: {e}")
+
+        delay = backoff.delay(attempts)
+        attempts += 1
+        stop_event.wait(delay)
@@ -1,107 +1,252 @@
 import os
-import json
 import asyncio
+import logging
 import discord
 from discord.ext import commands
+from inventory import InventoryStore
+from storage import CachedJsonLoader
+from subscriptions import SubscriptionIndex, parse_watch_query
+from alert_dispatcher import AlertDispatcher, TokenBucket, format_diff_alerts, pack_lines, PRIORITY_CATALOG, PRIORITY_RESTOCKED
 
 class WhiskeyBot:
-    def __init__(self, token, channel_id):
+    def __init__(self, token, channel_id, change_feed=None, extra_channel_ids=None, subscriptions=None, seed_from_feed=False):
         self.token = token
         self.channel_id = channel_id
+        self.channel_ids = [channel_id] + list(extra_channel_ids or [])  # Every channel gets every alert
+        self.dispatcher = None  # Created once the channels are resolved in on_ready
+        self.change_feed = change_feed  # In-process updates from the scraper; None to poll the JSON file
+        self.seed_from_feed = seed_from_feed  # Start from the feed's first snapshot instead of the JSON file (broker mode)
 
         # Dynamically construct the path to the JSON file in the data directory
         data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         self.json_file_path = os.path.join(data_dir, 'whiskey_data.json')
+        self.json_loader = CachedJsonLoader(self.json_file_path, default={})
 
-        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
-        self.last_known_data = None  # To track updates in the JSON file
+        self.create_bot(message_content=True)
+        self.inventory = InventoryStore()  # Last known inventory, to detect updates
+        self.inventory_loaded = False
 
-    def load_json_data(self):
+        # Watchlists registered with !watch / !watchrole, alerted on new and restocked bottles
+        self.subscriptions = subscriptions if subscriptions is not None else SubscriptionIndex()
+        self.dm_bucket = TokenBucket(rate=1.0, capacity=5)  # Keep DM bursts well under Discord's limits
+
+    def create_bot(self, message_content):
         """
-        Load the current JSON data from the file.
+        Create the Discord client (self.bot) with the watchlist commands registered.
+
+        "!" commands need the privileged Message Content intent. Mentioning the bot instead
+        ("@Bot watch ...") works without it, since Discord always sends the bot messages that
+        mention it.
         """
-        if os.path.exists(self.json_file_path):
-            with open(self.json_file_path, 'r') as file:
-                return json.load(file)
-        return {}
+        intents = discord.Intents.default()
+        intents.message_content = message_content
+        self.bot = commands.Bot(command_prefix=commands.when_mentioned_or("!"), intents=intents)
+        self.register_commands()
 
-    async def check_for_updates(self, channel):
+        @self.bot.event
+        async def on_ready():
+            await self.on_ready()
+
+    def register_commands(self):
         """
-        Periodically checks for updates in the JSON file and sends alerts to Discord.
+        Register the watchlist commands:
+            !watch <terms> [under <price>] [at <store>]
+            !watchrole @Role <terms> [under <price>] [at <store>]
+            !unwatch <id>
+            !watches
         """
-        while True:
-            try:
-                # Load the current data from the JSON file
-                current_data = self.load_json_data()
+        @self.bot.command(name='watch')
+        async def watch(ctx, *, query=''):
+            terms, max_price, store = parse_watch_query(query)
+            if not (terms or max_price is not None or store):
+                await ctx.send("Usage: !watch <terms> [under <price>] [at <store>]")
+                return
+            subscription = self.subscriptions.add(ctx.author.id, terms, max_price, store)
+            await ctx.send(f"Watching #{subscription.id}: {self.describe_subscription(subscription)} (alerts by DM)")
+
+        @self.bot.command(name='watchrole')
+        @commands.has_permissions(manage_roles=True)
+        async def watchrole(ctx, role: discord.Role, *, query=''):
+            terms, max_price, store = parse_watch_query(query)
+            if not (terms or max_price is not None or store):
+                await ctx.send("Usage: !watchrole @Role <terms> [under <price>] [at <store>]")
+                return
+            subscription = self.subscriptions.add(role.id, terms, max_price, store, kind='role')
+            await ctx.send(f"Watching #{subscription.id}: {self.describe_subscription(subscription)} (alerts mention {role.name})")
+
+        @self.bot.command(name='unwatch')
+        async def unwatch(ctx, subscription_id: int):
+            # Role watches can be removed by anyone allowed to manage roles
+            owners = [ctx.author.id]
+            if ctx.guild is not None and ctx.author.guild_permissions.manage_roles:
+                owners.extend(role.id for role in ctx.guild.roles)
+            if any(self.subscriptions.remove(owner_id, subscription_id) for owner_id in owners):
+                await ctx.send(f"Removed watch #{subscription_id}")
+            else:
+                await ctx.send(f"No watch #{subscription_id} of yours")
+
+        @self.bot.command(name='watches')
+        async def watches(ctx):
+            subscriptions = self.subscriptions.for_owner(ctx.author.id)
+            if not subscriptions:
+                await ctx.send("You have no watches. Add one with !watch <terms> [under <price>] [at <store>]")
+                return
+            for message in pack_lines(f"#{subscription.id}: {self.describe_subscription(subscription)}" for subscription in subscriptions):
+                await ctx.send(message)
+
+    @staticmethod
+    def describe_subscription(subscription):
+        parts = [" ".join(subscription.terms) or "anything"]
+        if subscription.max_price is not None:
+            parts.append(f"under ${subscription.max_price:g}")
+        if subscription.store:
+            parts.append(f"at {subscription.store}")
+        return " ".join(parts)
 
-                # If this is the first check, initialize last_known_data
-                if self.last_known_data is None:
-                    self.last_known_data = current_data
+    def load_json_data(self):
+        """
+        Load the current JSON data from the file (cached until the file changes).
+        """
+        return self.json_loader.load()
 
-                # If new data is found, send an alert
-                if current_data != self.last_known_data:
-                    # Convert dictionaries to tuples of sorted key-value pairs for comparison
-                    last_known_set = {tuple(sorted(entry.items())) for entry in self.last_known_data}
-                    current_set = {tuple(sorted(entry.items())) for entry in current_data}
+    async def alert_changes(self, current_data):
+        """
+        Diff data against the known inventory and send alerts for new, restocked, updated
+        and removed bottles.
+        """
+        # If this is the first check, initialize the inventory
+        if not self.inventory_loaded:
+            self.inventory.apply_snapshot(current_data)
+            self.inventory_loaded = True
+            return
 
-                    # Find new entries
-                    new_entries = current_set - last_known_set
+        diff = self.inventory.apply_snapshot(current_data)
+        if not diff:
+            return
 
-                    # Send alerts for new entries
-                    for entry in new_entries:
-                        dict_entry = dict(entry)  # Convert back to dictionary for display
-                        await channel.send(f"New data added: {dict_entry}")
-                    # new_entries = [entry for entry in current_data if entry not in self.last_known_data]
+        for line, priority in format_diff_alerts(diff):
+            self.dispatcher.add(line, priority)
+        dms = self.queue_subscriber_alerts(diff)
+        await asyncio.gather(self.dispatcher.flush(), *(self.send_dm(user_id, lines) for user_id, lines in dms.items()))
 
-                    # for entry in new_entries:
-                    #     await channel.send(f"New data added: {entry}")
+    def queue_subscriber_alerts(self, diff):
+        """
+        Match new and restocked bottles against the watchlists. Role matches are queued on the
+        channel dispatcher as mentions; DM matches are returned batched per user.
 
-                    # # Update the last known data
-                    self.last_known_data = current_data
+        Returns:
+            dict: user id -> alert lines for that user
+        """
+        entries = list(diff.added) + list(diff.restocked)
+        if not entries or not len(self.subscriptions):
+            return {}
+
+        dms = {}
+        for (kind, owner_id), matched in self.subscriptions.match_all(entries).items():
+            if kind == 'role':
+                names = ", ".join(entry.get('name') or '?' for entry in matched)
+                self.dispatcher.add(f"<@&{owner_id}> Watchlist match: {names}", PRIORITY_RESTOCKED)
+            else:
+                dms[owner_id] = ["Watchlist match:"] + [f"{entry}" for entry in matched]
+        return dms
+
+    async def send_dm(self, user_id, lines):
+        """Send a user their batched watchlist alerts."""
+        try:
+            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+            for message in pack_lines(lines):
+                await self.dm_bucket.acquire()
+                await user.send(message)
+        except Exception as e:
+            logging.error(f"Failed to DM watchlist alert to user {user_id}: {e}")
+
+    async def check_for_updates(self):
+        """
+        Periodically checks for updates in the JSON file and sends alerts to Discord.
+        Used as a durable fallback when the bot runs without a change feed.
+        """
+        while True:
+            try:
+                # Load the current data from the JSON file
+                current_data = self.load_json_data()
+                await self.alert_changes(current_data)
             except Exception as e:
                 print(f"Error checking for updates: {e}")
 
             # Wait 10 seconds before checking again
             await asyncio.sleep(10)
 
-    async def send_initial_data(self, channel):
+    async def watch_change_feed(self):
+        """
+        Waits for updates published by the scraper thread and sends alerts as soon as they arrive.
+        When seeding from the feed, the first update is the starting inventory instead.
+        """
+        if self.seed_from_feed and not self.inventory_loaded:
+            logging.info("Waiting for the first snapshot to seed the inventory")
+            await self.send_initial_data(await self.change_feed.get())
+
+        while True:
+            current_data = await self.change_feed.get()
+            try:
+                await self.alert_changes(current_data)
+            except Exception as e:
+                print(f"Error sending update alerts: {e}")
+
+    async def send_initial_data(self, current_data=None):
         """
-        Sends the current JSON data to the channel when the bot starts.
+        Sends the current data (the JSON file's, unless given) to the channels when the bot starts.
         """
-        current_data = self.load_json_data()
+        if current_data is None:
+            current_data = self.load_json_data()
         if current_data:
-            await channel.send("Current Bottles Detected:")
+            self.dispatcher.add("Current Bottles Detected:", PRIORITY_CATALOG)
             for entry in current_data:
-                await channel.send(f"{entry}")
+                self.dispatcher.add(f"{entry}", PRIORITY_CATALOG)
         else:
-            await channel.send("No data found in JSON file.")
+            self.dispatcher.add("No bottles listed yet." if self.seed_from_feed else "No data found in JSON file.", PRIORITY_CATALOG)
+        await self.dispatcher.flush()
 
-        # Initialize last_known_data with current data
-        self.last_known_data = current_data
+        # Initialize the known inventory with current data
+        self.inventory.apply_snapshot(current_data)
+        self.inventory_loaded = True
 
     async def on_ready(self):
         """
         Triggered when the bot is ready. Sends initial data and starts update monitoring.
         """
         print(f'Bot connected as {self.bot.user}')
-        channel = self.bot.get_channel(self.channel_id)
-
-        if channel is None:
-            print(f"Error: Channel ID {self.channel_id} not found.")
+        channels = []
+        for channel_id in self.channel_ids:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                print(f"Error: Channel ID {channel_id} not found.")
+            else:
+                channels.append(channel)
+
+        if not channels:
             return
+        self.dispatcher = AlertDispatcher(channels)
 
-        # Send initial data
-        await self.send_initial_data(channel)
+        # Send initial data, unless it's the first snapshot the change feed delivers
+        if not self.seed_from_feed:
+            await self.send_initial_data()
 
         # Start checking for updates
-        self.bot.loop.create_task(self.check_for_updates(channel))
+        if self.change_feed is not None:
+            self.bot.loop.create_task(self.watch_change_feed())
+        else:
+            self.bot.loop.create_task(self.check_for_updates())
 
     async def start(self):
         """
-        Starts the bot and initializes event handlers.
+        Starts the bot. If the Message Content intent isn't enabled for it in the developer
+        portal, it reconnects without it so alerts still go out, and commands need a mention.
         """
-        @self.bot.event
-        async def on_ready():
-            await self.on_ready()
-
-        await self.bot.start(self.token)  # Use bot.start() instead of bot.run()
+        try:
+            await self.bot.start(self.token)  # Use bot.start() instead of bot.run()
+        except discord.PrivilegedIntentsRequired:
+            logging.warning("The Message Content intent isn't enabled for this bot, "
+                            "watch commands only work by mentioning it (@Bot watch ...)")
+            await self.bot.close()
+            self.create_bot(message_content=False)
+            await self.bot.start(self.token)
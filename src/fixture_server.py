@@ -0,0 +1,130 @@
+import os
+import time
+import argparse
+import itertools
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Site paths that are served from a saved fixture file instead of the directory listing
+ROUTES = {
+    '/': 'index.html',
+    '/whiskey-release/whiskey-release': 'whiskey_page.html',
+}
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serve saved pages from a fixture directory under the same paths as the live site."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real site
+
+    def translate_path(self, path):
+        route = path.split('?', 1)[0].split('#', 1)[0].rstrip('/') or '/'
+        if route in ROUTES:
+            return os.path.join(self.directory, ROUTES[route])
+        return super().translate_path(path)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark and test output quiet
+
+# Served instead of the listing for the 'empty' and 'age_gate' faults
+EMPTY_PAGE = b"<html><body><div class='card-list'></div></body></html>"
+AGE_GATE_PAGE = b"<html><body><div class='age-gate'><button>I am 21 or older</button></div></body></html>"
+
+class FaultPlan:
+    """
+    Failures for FaultInjectingHandler to serve, in order.
+
+    Faults are 'ok', '403', '429', '500' (or any status code), 'empty' (a 200 page without
+    cards), 'age_gate' (a 200 age-verification page), 'slow:<seconds>' (delay, then serve
+    normally) and 'reset' (drop the connection without a response). Requests from a user agent
+    containing any of blocked_agents always get a 403, so identity rotation can be exercised.
+    """
+
+    def __init__(self, faults=(), repeat=False, blocked_agents=()):
+        """
+        Args:
+            faults (list): Fault per request; requests past the end are served normally
+            repeat (bool): Cycle through the faults forever instead
+            blocked_agents (list): User agent substrings to answer with a 403
+        """
+        self.faults = itertools.cycle(faults) if repeat and faults else iter(faults)
+        self.blocked_agents = list(blocked_agents)
+        self.lock = threading.Lock()
+        self.served = []  # (path, fault) for every request, for assertions
+
+    def next_fault(self, path, user_agent):
+        with self.lock:
+            if any(agent in (user_agent or '') for agent in self.blocked_agents):
+                fault = '403'
+            else:
+                fault = next(self.faults, 'ok')
+            self.served.append((path, fault))
+            return fault
+
+class FaultInjectingHandler(FixtureHandler):
+    """FixtureHandler that misbehaves according to the server's fault_plan (a FaultPlan)."""
+
+    def do_GET(self):
+        plan = getattr(self.server, 'fault_plan', None)
+        fault = plan.next_fault(self.path, self.headers.get('User-Agent')) if plan else 'ok'
+
+        if fault.startswith('slow:'):
+            time.sleep(float(fault.split(':', 1)[1]))
+            fault = 'ok'
+
+        if fault == 'ok':
+            return super().do_GET()
+        if fault == 'reset':
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if fault == 'empty':
+            return self._send_body(200, EMPTY_PAGE)
+        if fault == 'age_gate':
+            return self._send_body(200, AGE_GATE_PAGE)
+        self._send_body(int(fault), f"HTTP {fault}".encode('utf-8'))
+
+    def _send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '60')
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_fixture_server(fixture_dir, port=0, handler_class=FixtureHandler, fault_plan=None):
+    """
+    Start serving a fixture directory on localhost in a background thread.
+
+    Args:
+        fixture_dir (str): Directory holding the saved pages (e.g. whiskey_page.html)
+        port (int): Port to listen on, 0 picks a free one
+        handler_class (type): FixtureHandler, or FaultInjectingHandler to inject failures
+        fault_plan (FaultPlan): Failures for FaultInjectingHandler to serve
+
+    Returns:
+        tuple: (server, base_url). Call server.shutdown() to stop it.
+    """
+    handler = partial(handler_class, directory=fixture_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.fault_plan = fault_plan
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve saved whiskey pages for offline testing.")
+    parser.add_argument('--dir', default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--faults', default='', help="Comma-separated faults to serve in a loop, e.g. 'ok,429,empty,ok,403'")
+    parser.add_argument('--block-agent', action='append', default=[], help="Answer 403 to user agents containing this")
+    args = parser.parse_args()
+
+    faults = [fault.strip() for fault in args.faults.split(',') if fault.strip()]
+    handler_class = FaultInjectingHandler if faults or args.block_agent else FixtureHandler
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), partial(handler_class, directory=args.dir))
+    server.fault_plan = FaultPlan(faults, repeat=True, blocked_agents=args.block_agent)
+    print(f"Serving {args.dir} at http://127.0.0.1:{args.port}")
+    server.serve_forever()
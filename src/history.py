@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from identity import canonical_name
+from inventory import InventoryStore, product_key, parse_quantity
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    product TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    quantity INTEGER,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_name_ts ON events (name, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    target TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    compression TEXT NOT NULL,
+    html BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_target_ts ON pages (target, ts);
+"""
+
+def default_history_path():
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, 'history.sqlite3')
+
+def _compress(html_content):
+    data = html_content.encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+def _decompress(compression, blob):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Page was stored with zstd, install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+    return zlib.decompress(blob).decode('utf-8')
+
+class HistoryStore:
+    """
+    Append-only history of what changed on the listing, in SQLite (WAL mode).
+
+    Only per-product changes are stored (one event row per added, removed, changed or restocked
+    product), and the raw page is stored compressed only when its listing hash changes, so the
+    database grows with the number of changes rather than the number of polls.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): SQLite file (data/history.sqlite3 by default)
+        """
+        self.path = path or default_history_path()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()  # Scraper workers record from several threads
+
+        self.inventory = InventoryStore()
+        self.page_hashes = {
+            row['target']: row['content_hash']
+            for row in self.connection.execute(
+                "SELECT target, content_hash FROM pages WHERE id IN (SELECT MAX(id) FROM pages GROUP BY target)"
+            )
+        }
+
+    def seed(self, whiskey_data):
+        """Start from a known snapshot (e.g. the saved whiskey_data.json) without recording it."""
+        with self.lock:
+            self.inventory.apply_snapshot(whiskey_data)
+
+    def record_snapshot(self, whiskey_data, ts=None):
+        """
+        Diff a merged snapshot against the last one and append an event per changed product.
+
+        Returns:
+            InventoryDiff
+        """
+        ts = ts or time.time()
+        with self.lock:
+            diff = self.inventory.apply_snapshot(whiskey_data)
+            if not diff:
+                return diff
+
+            rows = []
+            for kind, entries in (('added', diff.added), ('removed', diff.removed), ('restocked', diff.restocked)):
+                for entry in entries:
+                    rows.append(self._event_row(ts, kind, entry, entry))
+            for change in diff.changed:
+                rows.append(self._event_row(ts, 'changed', change.new, {field: change.new.get(field) for field in change.fields}))
+
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO events (ts, product, name, kind, quantity, fields) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+        return diff
+
+    def _event_row(self, ts, kind, entry, fields):
+        return (
+            ts,
+            json.dumps(product_key(entry, self.inventory.resolver)),
+            canonical_name(entry.get('name')),
+            kind,
+            parse_quantity(entry),
+            json.dumps(fields, separators=(',', ':')),
+        )
+
+    def record_page(self, target, content_hash, html_content, ts=None):
+        """
+        Keep a compressed copy of a page, but only if its listing hash changed since the last copy.
+
+        Returns:
+            bool: Whether the page was stored
+        """
+        if content_hash is None or self.page_hashes.get(target) == content_hash:
+            return False
+
+        compression, blob = _compress(html_content)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO pages (ts, target, content_hash, compression, html) VALUES (?, ?, ?, ?, ?)",
+                (ts or time.time(), target, content_hash, compression, blob)
+            )
+            self.page_hashes[target] = content_hash
+        logging.info(f"Stored new page version for {target} ({len(blob)} bytes {compression})")
+        return True
+
+    def events(self, start=None, end=None, name=None, kinds=None):
+        """
+        Events in a time range, oldest first.
+
+        Args:
+            start (float): Unix time to start from (inclusive)
+            end (float): Unix time to stop at (exclusive)
+            name (str): Only events for this bottle (matched on its canonical name)
+            kinds (list): Only these kinds ('added', 'removed', 'changed', 'restocked')
+        """
+        query = "SELECT ts, product, name, kind, quantity, fields FROM events WHERE ts >= ? AND ts < ?"
+        params = [start if start is not None else 0, end if end is not None else float('inf')]
+        if name is not None:
+            query += " AND name = ?"
+            params.append(canonical_name(name))
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        query += " ORDER BY ts, id"
+
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [dict(row, fields=json.loads(row['fields'])) for row in rows]
+
+    def last_restock(self, name):
+        """Unix time the bottle was last added or restocked, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT MAX(ts) FROM events WHERE name = ? AND kind IN ('added', 'restocked')",
+                (canonical_name(name),)
+            ).fetchone()
+        return row[0]
+
+    def sell_through_rate(self, name, start=None, end=None):
+        """
+        Bottles sold per hour in a time range, from how fast the listed quantity went down.
+        Quantity increases (restocks) aren't counted. Returns None without two quantity readings.
+        """
+        readings = [
+            (event['ts'], event['quantity'])
+            for event in self.events(start, end, name=name)
+            if event['quantity'] is not None and event['kind'] != 'removed'
+        ]
+        if len(readings) < 2:
+            return None
+
+        sold = sum(max(0, previous - current) for (_, previous), (_, current) in zip(readings, readings[1:]))
+        hours = (readings[-1][0] - readings[0][0]) / 3600
+        return sold / hours if hours > 0 else None
+
+    def page_at(self, target, ts=None):
+        """HTML of a target's page as last stored at or before ts (latest by default), or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT compression, html FROM pages WHERE target = ? AND ts <= ? ORDER BY ts DESC, id DESC LIMIT 1",
+                (target, ts if ts is not None else float('inf'))
+            ).fetchone()
+        return _decompress(row['compression'], row['html']) if row else None
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -1,26 +1,282 @@
 import os
-import json
-from bs4 import BeautifulSoup
+import re
+import hashlib
+import importlib.util
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
+from storage import write_json_atomic
+from metrics import timed
 
-# Configure logging to match the scraper's configuration
-logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-os.makedirs(logs_dir, exist_ok=True)
+# Opening/closing div tags, used to cut the page into card-sized chunks without building a tree
+DIV_TAG_RE = re.compile(r'<div\b([^>]*)>|</div\s*>', re.IGNORECASE)
+CLASS_ATTR_RE = re.compile(r'''\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(logs_dir, "parser.log")),
-        logging.StreamHandler()
-    ]
-)
+# Parser engines, in the order they're compared. 'lxml' and 'selectolax' are optional installs.
+PARSER_ENGINES = ('html.parser', 'lxml', 'selectolax')
+DEFAULT_PARSER_ENGINE = os.getenv('WHISKEY_PARSER_ENGINE', 'html.parser')
 
-def parse_whiskey_html(html_content=None):
+def _has_card_class(value):
+    # Depending on the bs4 version this sees the whole class string or one class at a time
+    return value is not None and 'card' in value.split()
+
+# Only build the card subtrees when parsing a whole document
+CARD_STRAINER = SoupStrainer('div', class_=_has_card_class)
+
+class ParseCache:
+    """
+    State carried between scrapes so unchanged pages and cards don't get parsed again.
+
+    Attributes:
+        region_hash (str): Hash of the card listing region from the last parse
+        cards (dict): Card fingerprint -> whiskey_info dicts extracted from that card
+        whiskey_data (list): Result of the last parse
+    """
+
+    def __init__(self):
+        self.region_hash = None
+        self.cards = {}
+        self.whiskey_data = None
+
+    def reset(self):
+        self.__init__()
+
+_default_cache = ParseCache()
+
+def _is_card_div(attrs):
+    """Check whether a div's attribute string carries the 'card' class."""
+    match = CLASS_ATTR_RE.search(attrs)
+    if not match:
+        return False
+    classes = next(group for group in match.groups() if group is not None)
+    return 'card' in classes.split()
+
+def split_whiskey_cards(html_content):
+    """
+    Cut the raw HTML of every card div holding a whiskey title out of the page, in page order.
+
+    Returns None when the cards can't be isolated safely (nested cards), in which case the
+    caller should parse the whole document instead.
+    """
+    cards = []  # (start, end) of each card div
+    stack = []  # (start, is_card) for each open div
+    for match in DIV_TAG_RE.finditer(html_content):
+        if match.group(0)[1] != '/':
+            stack.append((match.start(), _is_card_div(match.group(1))))
+        elif stack:
+            start, is_card = stack.pop()
+            if is_card:
+                cards.append((start, match.end()))
+    # Cards left open by truncated markup run to the end of the page
+    cards.extend((start, len(html_content)) for start, is_card in stack if is_card)
+    cards.sort()
+
+    chunks = []
+    last_end = -1
+    for start, end in cards:
+        chunk = html_content[start:end]
+        if 'card_title_name' not in chunk:
+            continue
+        if start < last_end:
+            return None
+        chunks.append(chunk)
+        last_end = end
+    return chunks
+
+def _fingerprint(chunk):
+    return hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).hexdigest()
+
+def _extract_whiskey_info(title):
+    """Build the whiskey_info dict for one card_title_name h4."""
+    # Get the parent card element
+    card = title.find_parent('div', class_='card')  # Adjust class name if needed
+
+    # Initialize whiskey info dictionary
+    whiskey_info = {
+        'name': title.text.strip(),
+        'price': None,
+        'availability_type': None,
+        'store_availability': None,
+        'quantity_available': None,
+        'limit': None
+    }
+
+    # Extract price
+    price_elem = card.find('span', class_='card__price-amount')
+    if price_elem:
+        whiskey_info['price'] = price_elem.text.strip()
+
+    # Extract online availability
+    online_label = card.find('p', class_='online-available-label')
+    if online_label:
+        whiskey_info['availability_type'] = online_label.text.strip()
+
+    # Extract store availability
+    store_avail = card.find('div', class_='availability-label')
+    if store_avail:
+        whiskey_info['store_availability'] = store_avail.find('p').text.strip() if store_avail.find('p') else None
+
+    # Extract quantity available
+    avail_info = card.find('div', class_='availability-info')
+    if avail_info:
+        quantity_text = avail_info.find('p')
+        if quantity_text:
+            whiskey_info['quantity_available'] = quantity_text.text.strip()
+
+    # Extract limit information
+    limit_elem = card.find('p', class_='limited-text')
+    if limit_elem:
+        whiskey_info['limit'] = limit_elem.text.strip()
+
+    return whiskey_info
+
+def engine_available(engine):
+    """Check whether a parser engine can be used in this environment."""
+    if engine == 'html.parser':
+        return True
+    if engine in ('lxml', 'selectolax'):
+        return importlib.util.find_spec(engine) is not None
+    return False
+
+def _resolve_engine(engine):
+    """Pick the requested engine, falling back to html.parser if it isn't installed."""
+    engine = engine or DEFAULT_PARSER_ENGINE
+    if not engine_available(engine):
+        logging.warning(f"Parser engine '{engine}' is not available, using html.parser")
+        return 'html.parser'
+    return engine
+
+def _extract_whiskey_data(html_content, engine='html.parser', strain=False):
+    """
+    Parse an HTML document or fragment and extract every whiskey card in it.
+
+    Args:
+        html_content (str): Whole page or a single card's HTML
+        engine (str): One of PARSER_ENGINES
+        strain (bool): Only build the card subtrees (useful for whole pages)
+    """
+    if engine == 'selectolax':
+        return _extract_whiskey_data_selectolax(html_content)
+
+    # Create BeautifulSoup object from the HTML content
+    soup = BeautifulSoup(html_content, engine, parse_only=CARD_STRAINER if strain else None)
+
+    whiskey_data = []
+    for title in soup.find_all('h4', class_='card_title_name'):
+        try:
+            whiskey_data.append(_extract_whiskey_info(title))
+        except Exception as e:
+            logging.error(f"Error processing whiskey card: {e}")
+            continue
+    return whiskey_data
+
+def _selectolax_text(node):
+    return node.text(deep=True, strip=False).strip()
+
+def _extract_whiskey_data_selectolax(html_content):
+    """selectolax (lexbor) version of _extract_whiskey_data, producing the same dicts."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html_content)
+    whiskey_data = []
+    for title in tree.css('h4.card_title_name'):
+        try:
+            # Get the parent card element
+            card = title.parent
+            while card is not None and not (card.tag == 'div' and 'card' in (card.attributes.get('class') or '').split()):
+                card = card.parent
+            if card is None:
+                raise ValueError(f"no card element around '{_selectolax_text(title)}'")
+
+            whiskey_info = {
+                'name': _selectolax_text(title),
+                'price': None,
+                'availability_type': None,
+                'store_availability': None,
+                'quantity_available': None,
+                'limit': None
+            }
+
+            price_elem = card.css_first('span.card__price-amount')
+            if price_elem:
+                whiskey_info['price'] = _selectolax_text(price_elem)
+
+            online_label = card.css_first('p.online-available-label')
+            if online_label:
+                whiskey_info['availability_type'] = _selectolax_text(online_label)
+
+            store_avail = card.css_first('div.availability-label')
+            if store_avail:
+                store_text = store_avail.css_first('p')
+                whiskey_info['store_availability'] = _selectolax_text(store_text) if store_text else None
+
+            avail_info = card.css_first('div.availability-info')
+            if avail_info:
+                quantity_text = avail_info.css_first('p')
+                if quantity_text:
+                    whiskey_info['quantity_available'] = _selectolax_text(quantity_text)
+
+            limit_elem = card.css_first('p.limited-text')
+            if limit_elem:
+                whiskey_info['limit'] = _selectolax_text(limit_elem)
+
+            whiskey_data.append(whiskey_info)
+
+        except Exception as e:
+            logging.error(f"Error processing whiskey card: {e}")
+            continue
+    return whiskey_data
+
+def compare_parser_engines(html_content, engines=PARSER_ENGINES):
+    """
+    Check that every available engine extracts the same whiskey_info dicts as html.parser.
+
+    Returns:
+        dict: engine -> True/False, for each engine that is installed
+    """
+    reference = _extract_whiskey_data(html_content)
+    results = {}
+    for engine in engines:
+        if engine_available(engine):
+            results[engine] = (
+                _extract_whiskey_data(html_content, engine) == reference
+                and _extract_whiskey_data(html_content, engine, strain=True) == reference
+            )
+    return results
+
+def whiskey_json_path():
+    """Path of the JSON snapshot the bot reads."""
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, 'whiskey_data.json')
+
+def save_whiskey_data(whiskey_data):
+    """Atomically write whiskey data to the JSON snapshot. Returns the path written."""
+    json_file_path = whiskey_json_path()
+    with timed('json_write'):
+        write_json_atomic(json_file_path, whiskey_data)
+    return json_file_path
+
+@timed('parse_whiskey_html')
+def parse_whiskey_html(html_content=None, cache=None, force=False, engine=None, save_json=True):
     """
     Parse the whiskey release HTML content and extract whiskey information.
     Can accept either raw HTML content as a string or read from the saved HTML file.
+
+    The card listing is hashed first: if it matches the previous scrape, parsing and the JSON
+    write are skipped and the previous result is returned. Otherwise only cards whose HTML
+    changed are re-extracted.
+
+    Args:
+        html_content (str): Page HTML, or None to read the saved whiskey_page.html
+        cache (ParseCache): State from previous parses (a module-wide cache is used by default)
+        force (bool): Parse and write the JSON even if the listing is unchanged
+        engine (str): Parser engine (defaults to WHISKEY_PARSER_ENGINE, else html.parser)
+        save_json (bool): Write the result to whiskey_data.json (off when merging several pages)
     """
+    if cache is None:
+        cache = _default_cache
+    engine = _resolve_engine(engine)
+
     try:
         # If no HTML content is provided, read from the saved file
         if html_content is None:
@@ -35,78 +291,46 @@ def parse_whiskey_html(html_content=None):
             with open(html_file_path, 'r', encoding='utf-8') as f:
                 html_content = f.read()
 
-        # Create BeautifulSoup object from the HTML content
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Find all whiskey cards/items
-        whiskey_titles = soup.find_all('h4', class_='card_title_name')
-        
-        if not whiskey_titles:
+        chunks = split_whiskey_cards(html_content)
+
+        if chunks is None:
+            # Cards couldn't be isolated, fall back to parsing the whole document
+            cards, region_hash = {}, None
+            whiskey_data = _extract_whiskey_data(html_content, engine, strain=True)
+        else:
+            fingerprints = [_fingerprint(chunk) for chunk in chunks]
+            region_hash = hashlib.blake2b(''.join(fingerprints).encode('ascii'), digest_size=16).hexdigest()
+
+            if not force and region_hash == cache.region_hash and (not save_json or os.path.exists(whiskey_json_path())):
+                logging.info("Whiskey listing unchanged since last scrape, skipping parse")
+                return cache.whiskey_data
+
+            # Only re-extract cards that weren't on the previous page
+            cards = {}
+            whiskey_data = []
+            reparsed = 0
+            for fingerprint, chunk in zip(fingerprints, chunks):
+                if fingerprint not in cards:
+                    cards[fingerprint] = cache.cards.get(fingerprint)
+                    if cards[fingerprint] is None:
+                        cards[fingerprint] = _extract_whiskey_data(chunk, engine)
+                        reparsed += 1
+                whiskey_data.extend(cards[fingerprint])
+            logging.info(f"Re-extracted {reparsed} of {len(chunks)} whiskey cards")
+
+        if not whiskey_data:
             logging.warning("No whiskey titles found in the HTML content")
-            
-        # List to store all whiskey data
-        whiskey_data = []
-        
-        # Extract data from each whiskey item
-        for title in whiskey_titles:
-            try:
-                # Get the parent card element
-                card = title.find_parent('div', class_='card')  # Adjust class name if needed
-                
-                # Initialize whiskey info dictionary
-                whiskey_info = {
-                    'name': title.text.strip(),
-                    'price': None,
-                    'availability_type': None,
-                    'store_availability': None,
-                    'quantity_available': None,
-                    'limit': None
-                }
-                
-                # Extract price
-                price_elem = card.find('span', class_='card__price-amount')
-                if price_elem:
-                    whiskey_info['price'] = price_elem.text.strip()
-                
-                # Extract online availability
-                online_label = card.find('p', class_='online-available-label')
-                if online_label:
-                    whiskey_info['availability_type'] = online_label.text.strip()
-                
-                # Extract store availability
-                store_avail = card.find('div', class_='availability-label')
-                if store_avail:
-                    whiskey_info['store_availability'] = store_avail.find('p').text.strip() if store_avail.find('p') else None
-                
-                # Extract quantity available
-                avail_info = card.find('div', class_='availability-info')
-                if avail_info:
-                    quantity_text = avail_info.find('p')
-                    if quantity_text:
-                        whiskey_info['quantity_available'] = quantity_text.text.strip()
-                
-                # Extract limit information
-                limit_elem = card.find('p', class_='limited-text')
-                if limit_elem:
-                    whiskey_info['limit'] = limit_elem.text.strip()
-                
-                whiskey_data.append(whiskey_info)
-                
-            except Exception as e:
-                logging.error(f"Error processing whiskey card: {e}")
-                continue
-        
-        # Construct the file path to save the JSON in the data directory
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        json_file_path = os.path.join(data_dir, 'whiskey_data.json')
-        
+
         # Save to JSON file
-        with open(json_file_path, 'w', encoding='utf-8') as f:
-            json.dump(whiskey_data, f, indent=2)
+        if save_json:
+            json_file_path = save_whiskey_data(whiskey_data)
+            logging.info(f"Data saved to {json_file_path}")
+
+        cache.cards = cards
+        cache.region_hash = region_hash
+        cache.whiskey_data = whiskey_data
         
         logging.info(f"Found {len(whiskey_data)} whiskey items")
-        logging.info(f"Data saved to {json_file_path}")
         
         return whiskey_data
         
@@ -119,4 +343,4 @@ def parse_whiskey_html(html_content=None):
         return None
         
     finally:
-        logging.info("Parsing operation completed")
\ No newline at end of file
+        logging.info("Parsing operation completed")
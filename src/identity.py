@@ -0,0 +1,201 @@
+import re
+import hashlib
+import unicodedata
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+QUANTITY_RE = re.compile(r'\d+')
+DIGIT_LETTER_RE = re.compile(r'(?<=\d)(?=[a-z])|(?<=[a-z])(?=\d)')
+
+# Spellings of the same word that show up across listings ("15yr", "15 Yrs", "15 Year Old")
+TOKEN_ALIASES = {
+    'yr': 'year',
+    'yrs': 'year',
+    'years': 'year',
+    'yo': 'year',
+}
+
+def parse_price(entry):
+    """Price of an entry as a number ("$1,299.99" -> 1299.99), or None if it has none."""
+    match = PRICE_RE.search(entry.get('price') or '')
+    return float(match.group().replace(',', '')) if match else None
+
+def parse_quantity(entry):
+    """Number in an entry's quantity text ("3 available" -> 3), or None if there isn't one."""
+    match = QUANTITY_RE.search(entry.get('quantity_available') or '')
+    return int(match.group()) if match else None
+
+def name_tokens(text):
+    """
+    Canonical tokens of a product name or search: accents, case, apostrophes and spacing
+    removed, numbers split from units and common abbreviations spelled one way
+    ("Blanton’s 15yr" -> ['blantons', '15', 'year']).
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = text.replace("'", '').replace('’', '').replace('&', ' and ')
+    text = DIGIT_LETTER_RE.sub(' ', text)
+    return [TOKEN_ALIASES.get(token, token) for token in TOKEN_RE.findall(text)]
+
+@lru_cache(maxsize=65536)
+def canonical_name(name):
+    """Name with formatting noise removed, see name_tokens. Memoized, names repeat every scrape."""
+    return ' '.join(name_tokens(name))
+
+def _clean_text(value):
+    return ' '.join(value.split()) if isinstance(value, str) else value
+
+def normalize_entry(entry):
+    """
+    Typed copy of a whiskey_info dict for comparisons: canonical name, price and quantity as
+    numbers (quantity text without a number is kept) and every other text field with its
+    whitespace collapsed.
+    """
+    normalized = {field: _clean_text(value) for field, value in entry.items()}
+    if entry.get('name') is not None:
+        normalized['name'] = canonical_name(entry['name'])
+    if entry.get('price') is not None:
+        normalized['price'] = parse_price(entry)
+    quantity = parse_quantity(entry)
+    if quantity is not None:
+        normalized['quantity_available'] = quantity
+    return normalized
+
+def _within_edits(first, second, limit):
+    """Whether two words are at most `limit` insertions, deletions or substitutions apart."""
+    if abs(len(first) - len(second)) > limit:
+        return False
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+def _typo_allowance(word):
+    # Short words are too easily a different word after one edit ("rye"/"rum")
+    if word.isdigit() or len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+def same_words(first, second):
+    """
+    Whether two canonical names spell the same words: identical once spaces are removed
+    ("old forester" / "oldforester"), or the same number of words with each pair equal or a
+    small typo apart ("weller" / "weler"). A word missing or added on either side never matches.
+    """
+    first_tokens, second_tokens = first.split(), second.split()
+    if ''.join(first_tokens) == ''.join(second_tokens):
+        return True
+    if len(first_tokens) != len(second_tokens):
+        return False
+    return all(
+        a == b or _within_edits(a, b, min(_typo_allowance(a), _typo_allowance(b)))
+        for a, b in zip(first_tokens, second_tokens)
+    )
+
+class ProductResolver:
+    """
+    Maps product names to a stable identity, treating near-duplicates as the same product.
+
+    Canonical names are compared by the Jaccard similarity of their character trigrams. To avoid
+    comparing a name against the whole catalog, each known name is indexed by a MinHash signature
+    cut into LSH bands: only names sharing a band bucket are compared. A similar name is then only
+    merged if it is a spelling or spacing variant word for word (see same_words), so a name plus
+    an extra word ("... Rye") stays its own product, and names that differ in any number (age
+    statement, proof, size) are never merged. Resolutions are memoized, so the cost is paid once
+    per distinct spelling.
+    """
+
+    def __init__(self, threshold=0.8, bands=8, rows=2, max_memo=100000):
+        """
+        Args:
+            threshold (float): Minimum trigram Jaccard similarity for two names to be merged
+            bands (int): LSH bands (more bands find more candidates)
+            rows (int): MinHash rows per band (more rows make candidates stricter)
+            max_memo (int): Spellings to remember before the memo is cleared
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_memo = max_memo
+        self.memo = {}  # raw name -> identity
+        self.shingles = {}  # identity -> trigram set
+        self.compact = {}  # canonical name without spaces -> identity
+        self.buckets = {}  # (numbers in the name, band, band signature) -> identities
+        self.hashes = [(2 * i + 1) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF for i in range(bands * rows)]
+        self.shingle_hashes = {}  # trigram -> its value under every MinHash function
+
+    def __len__(self):
+        return len(self.shingles)
+
+    @staticmethod
+    def _trigrams(canonical):
+        padded = f' {canonical} '
+        return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+    def _shingle_hashes(self, shingle):
+        hashes = self.shingle_hashes.get(shingle)
+        if hashes is None:
+            value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            hashes = self.shingle_hashes[shingle] = tuple((value * multiplier) & 0xFFFFFFFFFFFFFFFF for multiplier in self.hashes)
+        return hashes
+
+    def _signature(self, shingles):
+        # Trigrams repeat across names, so their hashes are cached and the minimums taken column-wise
+        minimums = [min(column) for column in zip(*(self._shingle_hashes(shingle) for shingle in shingles))]
+        return [tuple(minimums[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    @staticmethod
+    def _numbers(canonical):
+        return tuple(token for token in canonical.split() if token.isdigit())
+
+    def resolve(self, name):
+        """
+        Identity of a product name: the canonical spelling of the first name seen that is
+        similar enough to it, or its own canonical spelling.
+        """
+        identity = self.memo.get(name)
+        if identity is not None:
+            return identity
+
+        canonical = canonical_name(name)
+        if canonical not in self.shingles:
+            identity = self._match(canonical)
+        else:
+            identity = canonical
+
+        if len(self.memo) >= self.max_memo:
+            self.memo.clear()
+        self.memo[name] = identity
+        return identity
+
+    def _match(self, canonical):
+        # Spacing variants can be too far apart in trigrams to be found through the index
+        compact = canonical.replace(' ', '')
+        if compact in self.compact:
+            return self.compact[compact]
+
+        shingles = self._trigrams(canonical)
+        # Buckets are split by the numbers in the name, so e.g. a 12 and a 15 year are never candidates
+        numbers = self._numbers(canonical)
+        keys = [(numbers, band, signature) for band, signature in enumerate(self._signature(shingles))]
+
+        best, best_score = None, self.threshold
+        for candidate in set().union(*(self.buckets.get(key, ()) for key in keys)):
+            other = self.shingles[candidate]
+            score = len(shingles & other) / len(shingles | other)
+            if score >= best_score and same_words(canonical, candidate):
+                best, best_score = candidate, score
+        if best is not None:
+            return best
+
+        self.shingles[canonical] = shingles
+        self.compact[compact] = canonical
+        for key in keys:
+            self.buckets.setdefault(key, []).append(canonical)
+        return canonical
@@ -0,0 +1,172 @@
+import json
+import hashlib
+from collections import namedtuple
+from identity import ProductResolver, canonical_name, normalize_entry, parse_price, parse_quantity
+
+# A record whose fields changed between two snapshots
+ChangedRecord = namedtuple('ChangedRecord', ['key', 'old', 'new', 'fields'])
+
+def product_key(entry, resolver=None):
+    """
+    Identity of a product across scrapes: its canonical name and numeric price, or its SKU when
+    the page provides one. With a ProductResolver, near-duplicate spellings of a name share a key.
+    """
+    if entry.get('sku'):
+        return ('sku', str(entry['sku']).strip())
+    name = resolver.resolve(entry.get('name')) if resolver is not None else canonical_name(entry.get('name'))
+    return (name, parse_price(entry))
+
+def record_version(entry):
+    """Hash of a record's normalized fields, used to tell whether it changed."""
+    encoded = json.dumps(normalize_entry(entry), sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+class InventoryDiff:
+    """
+    What changed between two snapshots.
+
+    Attributes:
+        added (list): Records that weren't listed before
+        removed (list): Records that are no longer listed
+        changed (list): ChangedRecord for each record whose fields changed
+        restocked (list): Records that came back after being removed, or whose quantity went up
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.restocked = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.restocked)
+
+    def __repr__(self):
+        return (f"InventoryDiff(added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)}, restocked={len(self.restocked)})")
+
+class InventoryStore:
+    """
+    Current inventory keyed by product identity, with a version hash per record.
+
+    Products are keyed through a ProductResolver and versions are hashed from normalized fields,
+    so whitespace, price formatting and respellings of a name don't show up as new products.
+
+    apply_snapshot() diffs a new parse result against the store. Records are compared by version
+    hash, and records handed back unchanged by the parse cache (the same dict objects) aren't
+    even re-hashed, so the work beyond a dict lookup per product scales with what changed.
+    """
+
+    def __init__(self, resolver=None):
+        """
+        Args:
+            resolver (ProductResolver): Resolves near-duplicate names (a new one by default)
+        """
+        self.resolver = resolver if resolver is not None else ProductResolver()
+        self.records = {}  # key -> record
+        self.versions = {}  # key -> version hash
+        self.retired = {}  # key -> last record seen before it was removed
+        self.groups = {}  # identity -> keys of the cards sharing it
+        self._hashed = {}  # id(record) -> (record, key, version) from the last snapshot
+        self._last_snapshot = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def _identify(self, entry):
+        cached = self._hashed.get(id(entry))
+        if cached is not None and cached[0] is entry:
+            return cached[1], cached[2]
+        return product_key(entry, self.resolver), record_version(entry)
+
+    def _assign_duplicates(self, base_key, cards):
+        """
+        Give each of several cards sharing an identity (e.g. one per store) its own key, in place.
+        Cards keep the key of the previous card with the same version, so reordering them on the
+        page changes nothing; the rest take the remaining old keys, then new numbered ones.
+        """
+        old_keys = self.groups.get(base_key, [])
+        by_version = {}
+        for key in old_keys:
+            by_version.setdefault(self.versions[key], []).append(key)
+
+        used = set()
+        unmatched = []
+        for card in cards:
+            keys = by_version.get(card[2])
+            if keys:
+                card[0] = keys.pop(0)
+                used.add(card[0])
+            else:
+                unmatched.append(card)
+
+        spare = (key for key in old_keys if key not in used)
+        occurrence = 1
+        for card in unmatched:
+            key = next(spare, None)
+            while key is None:
+                candidate = base_key if occurrence == 1 else base_key + (occurrence,)
+                occurrence += 1
+                if candidate not in used and candidate not in old_keys:
+                    key = candidate
+            card[0] = key
+            used.add(key)
+
+    def apply_snapshot(self, entries):
+        """
+        Replace the inventory with a new snapshot and return what changed.
+
+        Args:
+            entries (list): whiskey_info dicts, as returned by parse_whiskey_html
+
+        Returns:
+            InventoryDiff
+        """
+        diff = InventoryDiff()
+        if entries is self._last_snapshot:
+            return diff
+
+        identified = []
+        groups = {}  # base key -> indexes into identified, for cards sharing an identity
+        hashed = {}
+        for entry in entries:
+            base_key, version = self._identify(entry)
+            groups.setdefault(base_key, []).append(len(identified))
+            identified.append([base_key, entry, version])
+            hashed[id(entry)] = (entry, base_key, version)
+        for base_key, indexes in groups.items():
+            if len(indexes) > 1 or self.groups.get(base_key, [base_key]) != [base_key]:
+                self._assign_duplicates(base_key, [identified[index] for index in indexes])
+
+        records = {}
+        versions = {}
+        for key, entry, version in identified:
+            records[key] = entry
+            versions[key] = version
+
+            old_version = self.versions.get(key)
+            if old_version is None:
+                if key in self.retired:
+                    diff.restocked.append(entry)
+                    del self.retired[key]
+                else:
+                    diff.added.append(entry)
+            elif old_version != version:
+                old = self.records[key]
+                old_normalized, new_normalized = normalize_entry(old), normalize_entry(entry)
+                fields = [field for field in set(old) | set(entry) if old_normalized.get(field) != new_normalized.get(field)]
+                diff.changed.append(ChangedRecord(key, old, entry, sorted(fields)))
+                if (parse_quantity(entry) or 0) > (parse_quantity(old) or 0):
+                    diff.restocked.append(entry)
+
+        if len(records) != len(self.records) or diff.added or diff.restocked:
+            for key in self.records.keys() - records.keys():
+                diff.removed.append(self.records[key])
+                self.retired[key] = self.records[key]
+
+        self.records = records
+        self.versions = versions
+        self.groups = {base_key: [identified[index][0] for index in indexes] for base_key, indexes in groups.items()}
+        self._hashed = hashed
+        self._last_snapshot = entries
+        return diff
@@ -1,54 +1,457 @@
 import os
-import asyncio
-import threading
+import sys
+import time
 import logging
-from scraper import WhiskeyScraper
-from discord_bot import WhiskeyBot
+import argparse
+
+# Taken before anything heavy is imported, for the startup-time budget
+PROCESS_STARTED_AT = time.perf_counter()
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
-
 # Configuration from .env
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')  # Discord bot token
 DISCORD_CHANNEL_ID = int(os.getenv('DISCORD_CHANNEL_ID', 0))  # Convert to int; defaults to 0 if not provided
+# Optional comma-separated list of additional channels that receive the same alerts
+DISCORD_EXTRA_CHANNEL_IDS = [int(channel_id) for channel_id in os.getenv('DISCORD_EXTRA_CHANNEL_IDS', '').split(',') if channel_id.strip()]
+
+# Browser session reuse (see WhiskeyScraper for what each budget does)
+SCRAPER_PERSISTENT_SESSION = os.getenv('SCRAPER_PERSISTENT_SESSION', '1') == '1'
+SCRAPER_MAX_SESSION_AGE = int(os.getenv('SCRAPER_MAX_SESSION_AGE', 1800))  # Seconds
+SCRAPER_MAX_BROWSER_RSS_MB = int(os.getenv('SCRAPER_MAX_BROWSER_RSS_MB', 1024))
+
+# Lean browser profile (no images, fonts or trackers) and an optional HTTP cache kept across launches
+SCRAPER_LEAN_BROWSER = os.getenv('SCRAPER_LEAN_BROWSER', '1') == '1'
+SCRAPER_BROWSER_CACHE_DIR = os.getenv('SCRAPER_BROWSER_CACHE_DIR') or None
+
+# HTTP fast path, tried before the browser (Selenium is only used when it fails validation)
+SCRAPER_FAST_PATH = os.getenv('SCRAPER_FAST_PATH', '1') == '1'
+FAST_PATH_COOKIES = os.getenv('FAST_PATH_COOKIES', '')  # e.g. "age_verified=true;other=1"
+
+# Pages to watch as "name=url|interval|jitter,..." (defaults to the whiskey release page every 60-90s)
+SCRAPE_TARGETS = os.getenv('SCRAPE_TARGETS', '')
+SCRAPER_WORKERS = int(os.getenv('SCRAPER_WORKERS', 1))  # Each worker has its own browser/HTTP session
+
+# Adaptive polling: fast during drop windows and after changes, backing off while quiet
+SCRAPER_ADAPTIVE = os.getenv('SCRAPER_ADAPTIVE', '1') == '1'
+SCRAPER_MIN_INTERVAL = float(os.getenv('SCRAPER_MIN_INTERVAL', 30))  # Seconds
+SCRAPER_MAX_INTERVAL = float(os.getenv('SCRAPER_MAX_INTERVAL', 900))  # Seconds
+SCRAPER_REQUESTS_PER_HOUR = int(os.getenv('SCRAPER_REQUESTS_PER_HOUR', 90))
+DROP_WINDOWS = os.getenv('DROP_WINDOWS', '')  # e.g. "Mon,Thu@09:00-11:00;Fri@22:00-02:00" (overnight runs into the next day)
+
+# Identities to rotate through when one gets blocked: user agents separated by "|" and
+# comma-separated proxies (e.g. "http://10.0.0.2:3128"). Each pair gets its own cookies.
+SCRAPER_USER_AGENTS = [agent.strip() for agent in os.getenv('SCRAPER_USER_AGENTS', '').split('|') if agent.strip()]
+SCRAPER_PROXIES = [proxy.strip() for proxy in os.getenv('SCRAPER_PROXIES', '').split(',') if proxy.strip()]
+# Consecutive failed fetches of a target before it's left alone for a (growing) while
+SCRAPER_BREAKER_FAILURES = int(os.getenv('SCRAPER_BREAKER_FAILURES', 3))
+
+# Append-only change history in data/history.sqlite3
+HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', '1') == '1'
+
+# Prometheus-style metrics on http://127.0.0.1:<port>/metrics (0 disables), and an optional JSON-lines stage trace
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+METRICS_TRACE_FILE = os.getenv('METRICS_TRACE_FILE', '')
+
+# Set to 1 to have the bot poll whiskey_data.json instead of receiving updates in-process
+BOT_FILE_POLLING = os.getenv('BOT_FILE_POLLING', '0') == '1'
+
+# Sharded mode: run one `broker` (assigns SCRAPE_TARGETS to nodes and merges their results), any
+# number of `node`s (each with its own NODE_ID) and one `bot --broker`. CLUSTER_ROLE picks the
+# command when none is given on the command line.
+CLUSTER_ROLE = os.getenv('CLUSTER_ROLE', '')
+BROKER_ADDRESS = os.getenv('BROKER_ADDRESS', '127.0.0.1:7400')
+NODE_ID = os.getenv('NODE_ID', '')
+NODE_HEARTBEAT_TIMEOUT = float(os.getenv('NODE_HEARTBEAT_TIMEOUT', 20))  # Seconds before a silent node's targets move
+# Shared secret every node and bot must present to the broker; required unless the broker only
+# listens on 127.0.0.1. Traffic is not encrypted, so keep the broker on a private network either way.
+CLUSTER_SECRET = os.getenv('CLUSTER_SECRET', '')
+
+# Seconds from process start until a command is ready to work; going over is logged as a warning
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', 2.0))
+
+LOG_FORMAT = '%(asctime)s - %(message)s'
+
+def parse_cookie_string(cookie_string):
+    """Turn "name=value;name2=value2" into a dict."""
+    cookies = {}
+    for pair in cookie_string.split(';'):
+        if '=' in pair:
+            name, value = pair.split('=', 1)
+            cookies[name.strip()] = value.strip()
+    return cookies
+
+def configure_logging(log_name=None, level=logging.INFO):
+    """
+    Set up logging for the whole process, once: to stderr and, if log_name is given, to
+    logs/<log_name>.log.
+    """
+    handlers = [logging.StreamHandler()]
+    if log_name:
+        logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+        os.makedirs(logs_dir, exist_ok=True)
+        handlers.append(logging.FileHandler(os.path.join(logs_dir, f"{log_name}.log")))
+    logging.basicConfig(level=level, format=LOG_FORMAT, handlers=handlers)
+
+def start_observability():
+    """Start the metrics endpoint and stage trace, if configured."""
+    from metrics import start_metrics_server, enable_trace
+
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT)
+        except OSError as e:
+            # e.g. another command on this host already serves the port; scraping matters more
+            logging.warning(f"Metrics endpoint not started, port {METRICS_PORT} is unavailable ({e}); set METRICS_PORT per process")
+    if METRICS_TRACE_FILE:
+        enable_trace(METRICS_TRACE_FILE)
 
-def run_scraper():
+def startup_complete(args):
     """
-    Continuously run the scraper in cycles, restarting the browser session after each cycle.
+    Record how long the command took to become ready and check it against STARTUP_BUDGET.
+    With --check-startup the process exits here (non-zero if over budget), before any network work.
+    """
+    elapsed = time.perf_counter() - PROCESS_STARTED_AT
+    within_budget = elapsed <= STARTUP_BUDGET
+    if args.check_startup:
+        print(f"{args.command}: started in {elapsed * 1000:.0f}ms (budget {STARTUP_BUDGET * 1000:.0f}ms)")
+        sys.exit(0 if within_budget else 1)
+
+    from metrics import STARTUP_SECONDS
+    STARTUP_SECONDS.set(elapsed, command=args.command)
+    if within_budget:
+        logging.info(f"{args.command} started in {elapsed * 1000:.0f}ms")
+    else:
+        logging.warning(f"{args.command} took {elapsed * 1000:.0f}ms to start, over the {STARTUP_BUDGET * 1000:.0f}ms budget")
+
+def scrape_targets():
+    from scheduler import DEFAULT_TARGETS, parse_targets
+    return parse_targets(SCRAPE_TARGETS) or DEFAULT_TARGETS
+
+def broker_address():
+    from cluster import parse_address
+    return parse_address(BROKER_ADDRESS)
+
+def create_scraper_session(identity=None):
+    """
+    Create one worker's scraping session for an identity (see supervisor.Identity). In persistent
+    mode its browser is reused across polls and only recycled when it fails a health check or
+    exceeds its budget; otherwise it's closed after every fetch that needed it.
+    """
+    from scraper import WhiskeyScraper
+    from fetchers import HttpFetcher
+
+    user_agent = identity.user_agent if identity else None
+    proxy = identity.proxy if identity else None
+
+    fetchers = []
+    if SCRAPER_FAST_PATH:
+        fetchers.append(HttpFetcher(cookies=parse_cookie_string(FAST_PATH_COOKIES), user_agent=user_agent, proxy=proxy))
+
+    return WhiskeyScraper(
+        persistent=SCRAPER_PERSISTENT_SESSION,
+        max_session_age=SCRAPER_MAX_SESSION_AGE,
+        max_browser_rss_mb=SCRAPER_MAX_BROWSER_RSS_MB,
+        fetchers=fetchers,
+        lean=SCRAPER_LEAN_BROWSER,
+        cache_dir=SCRAPER_BROWSER_CACHE_DIR,
+        user_agent=user_agent,
+        proxy=proxy
+    )
+
+def create_policy():
+    """The adaptive polling policy, or None for fixed intervals. Raises ValueError for bad DROP_WINDOWS."""
+    from scheduler import AdaptivePolicy, parse_drop_windows
+
+    drop_windows = parse_drop_windows(DROP_WINDOWS)  # Checked even when unused, a typo shouldn't lie in wait
+    if not SCRAPER_ADAPTIVE:
+        return None
+    return AdaptivePolicy(
+        min_interval=SCRAPER_MIN_INTERVAL,
+        max_interval=SCRAPER_MAX_INTERVAL,
+        drop_windows=drop_windows,
+        requests_per_hour=SCRAPER_REQUESTS_PER_HOUR
+    )
+
+def create_history():
+    """The change history store, or None if it's disabled."""
+    import json
+    from history import HistoryStore
+    from html_parser import whiskey_json_path
+
+    if not HISTORY_ENABLED:
+        return None
+    history = HistoryStore()
+    # Pick up from the last saved snapshot so a restart isn't recorded as every bottle being added
+    if os.path.exists(whiskey_json_path()):
+        with open(whiskey_json_path(), 'r') as file:
+            history.seed(json.load(file))
+    return history
+
+def create_supervisor():
+    """Fetch supervisor rotating through the configured identities."""
+    from supervisor import FetchSupervisor, build_identities
+
+    return FetchSupervisor(
+        create_scraper_session,
+        identities=build_identities(SCRAPER_USER_AGENTS, SCRAPER_PROXIES),
+        failure_threshold=SCRAPER_BREAKER_FAILURES
+    )
+
+def run_scraper(targets, policy, change_feed=None):
+    """
+    Continuously poll every scrape target over a pool of worker sessions.
+    Merged results are published to the change feed, if one is given.
+    targets and policy come from main(), which checks the configuration before any thread starts.
+
+    Fetches go through a FetchSupervisor (circuit breakers and identity rotation), and the
+    scheduler is restarted with exponential backoff if it crashes.
     """
+    from scheduler import ScrapeScheduler
+    from supervisor import Backoff
+
+    history = create_history()
+    supervisor = create_supervisor()
+
+    restart_backoff = Backoff(base=5, cap=300)
+    restarts = 0
     while True:
+        started_at = time.monotonic()
         try:
-            logging.info("Starting a new browser session for the scraper...")
-            scraper = WhiskeyScraper()
-            scraper.start_scraper(iterations=6, min_sleep=60, max_sleep=90)
-            logging.info("Closing the browser session...")
-            scraper.driver.quit()  # Explicitly close the browser session
-            
+            scheduler = ScrapeScheduler(
+                targets,
+                supervisor.session,
+                workers=SCRAPER_WORKERS,
+                on_snapshot=change_feed.publish_snapshot if change_feed else None,
+                policy=policy,
+                history=history
+            )
+            scheduler.run()
+
         except Exception as e:
             logging.error(f"An error occurred in the scraper loop: {e}")
-            continue  # Restart the loop even if an exception occurs
 
-async def run_bot():
+        # Restart even if an exception occurs, but back off if it keeps happening
+        if time.monotonic() - started_at > restart_backoff.cap:
+            restarts = 0
+        delay = restart_backoff.delay(restarts)
+        restarts += 1
+        logging.info(f"Restarting the scraper in {delay:.0f}s")
+        time.sleep(delay)
+
+def run_broker(args):
+    """
+    Coordinate scraper nodes (sharded mode). The merged snapshot is saved to whiskey_data.json
+    and recorded in the history, as a single-process scraper would.
+    """
+    import threading
+    from cluster import Broker
+    from html_parser import save_whiskey_data
+
+    startup_complete(args)
+    history = create_history()
+
+    def on_snapshot(whiskey_data):
+        save_whiskey_data(whiskey_data)
+        if history:
+            history.record_snapshot(whiskey_data)
+
+    host, port = args.address
+    broker = Broker(
+        args.targets,
+        host=host,
+        port=port,
+        heartbeat_timeout=NODE_HEARTBEAT_TIMEOUT,
+        on_snapshot=on_snapshot,
+        secret=CLUSTER_SECRET or None
+    )
+    broker.start()
+    threading.Event().wait()
+
+def run_node(args):
+    """Scrape whatever targets the broker assigns this node (sharded mode)."""
+    import socket
+    from cluster import ScraperNode
+    # The scraping stack is loaded now rather than on the first assignment, so it counts towards startup
+    import scraper, scheduler, supervisor  # noqa: F401
+
+    startup_complete(args)
+    node = ScraperNode(
+        broker_address(),
+        NODE_ID or socket.gethostname(),
+        create_supervisor().session,
+        secret=CLUSTER_SECRET or None,
+        workers=SCRAPER_WORKERS,
+        policy=args.policy
+    )
+    node.run()
+
+async def run_bot(change_feed=None, seed_from_feed=False):
     """
-    Run the Discord bot in an asyncio event loop.
+    Run the Discord bot in an asyncio event loop. With seed_from_feed the bot's starting
+    inventory is the first snapshot from the change feed rather than the local whiskey_data.json.
     """
+    from discord_bot import WhiskeyBot
+
     bot = WhiskeyBot(
         token=DISCORD_TOKEN,
-        channel_id=DISCORD_CHANNEL_ID
+        channel_id=DISCORD_CHANNEL_ID,
+        change_feed=change_feed,
+        extra_channel_ids=DISCORD_EXTRA_CHANNEL_IDS,
+        seed_from_feed=seed_from_feed
     )
     await bot.start()
 
-if __name__ == "__main__":
-    # Configure logging
-    logging.basicConfig(level=logging.INFO)
+def serve(args, with_scraper, broker=None):
+    """
+    Run the bot, fed by an in-process scraper (with_scraper), by a broker, or by polling
+    whiskey_data.json when neither is given.
+    """
+    import asyncio
+    import threading
+    from change_feed import ChangeFeed
+    import discord_bot  # noqa: F401  (the bot's import cost counts towards startup)
 
-    # Start scraper in a separate thread
-    scraper_thread = threading.Thread(target=run_scraper)
-    scraper_thread.daemon = True  # Ensures the thread exits when the main program exits
-    scraper_thread.start()
+    if with_scraper:
+        import scraper, scheduler, supervisor  # noqa: F401
+
+    startup_complete(args)
 
-    # Start the Discord bot in the asyncio event loop
     loop = asyncio.get_event_loop()
-    loop.create_task(run_bot())  # Schedule the bot as a coroutine
+    change_feed = None
+    if broker:
+        from cluster import subscribe_snapshots, parse_address
+
+        # Updates come from the broker instead of a local scraper
+        change_feed = ChangeFeed(loop)
+        feeder = threading.Thread(
+            target=subscribe_snapshots,
+            args=(parse_address(broker), change_feed.publish_snapshot),
+            kwargs={'secret': CLUSTER_SECRET or None}
+        )
+    elif with_scraper:
+        change_feed = None if BOT_FILE_POLLING else ChangeFeed(loop)
+        # Start scraper in a separate thread
+        feeder = threading.Thread(target=run_scraper, args=(args.targets, args.policy, change_feed))
+    else:
+        feeder = None  # The bot polls whiskey_data.json, written by a separate scraper process
+
+    if feeder is not None:
+        feeder.daemon = True  # Ensures the thread exits when the main program exits
+        feeder.start()
+
+    # Start the Discord bot in the asyncio event loop
+    # The broker's bot may run on another host, so its starting inventory is the broker's first snapshot
+    loop.create_task(run_bot(change_feed, seed_from_feed=bool(broker)))  # Schedule the bot as a coroutine
     loop.run_forever()  # Keep the loop running
+
+def command_run(args):
+    serve(args, with_scraper=True)
+
+def command_bot(args):
+    serve(args, with_scraper=False, broker=args.broker)
+
+def command_scraper(args):
+    import scraper, scheduler, supervisor  # noqa: F401
+
+    startup_complete(args)
+    run_scraper(args.targets, args.policy)
+
+def command_parse_once(args):
+    """Parse a saved page and print the whiskey data as JSON."""
+    import json
+    from html_parser import parse_whiskey_html, ParseCache
+
+    startup_complete(args)
+    if args.file == '-':
+        html_content = sys.stdin.read()
+    else:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+
+    whiskey_data = parse_whiskey_html(html_content, cache=ParseCache(), engine=args.engine, save_json=args.save)
+    if whiskey_data is None:
+        sys.exit(1)
+    json.dump(whiskey_data, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+def command_bench(args):
+    import bench
+
+    startup_complete(args)
+    sys.exit(bench.main(args.bench_args))
+
+COMMANDS = {
+    'run': command_run,
+    'bot': command_bot,
+    'scraper': command_scraper,
+    'broker': run_broker,
+    'node': run_node,
+    'parse-once': command_parse_once,
+    'bench': command_bench,
+}
+
+def build_parser():
+    default_page = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'whiskey_page.html')
+
+    parser = argparse.ArgumentParser(description="Whiskey release scraper and Discord bot.")
+    parser.add_argument('--check-startup', action='store_true',
+                        help=f"Load the command, report the startup time against STARTUP_BUDGET ({STARTUP_BUDGET}s) and exit")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    commands.add_parser('run', help="Scraper and bot in one process (the default)")
+    bot = commands.add_parser('bot', help="Bot only, fed by a broker or by polling whiskey_data.json")
+    bot.add_argument('--broker', default=BROKER_ADDRESS if CLUSTER_ROLE == 'bot' else None,
+                     help="Broker host:port to receive merged snapshots from")
+    commands.add_parser('scraper', help="Scraper only, writing whiskey_data.json")
+    commands.add_parser('broker', help="Assign targets to scraper nodes and merge their results")
+    commands.add_parser('node', help="Scrape the targets a broker assigns")
+    parse_once = commands.add_parser('parse-once', help="Parse a saved page and print the whiskey data as JSON")
+    parse_once.add_argument('file', nargs='?', default=default_page, help="HTML file, or - for stdin")
+    parse_once.add_argument('--engine', help="Parser engine (html.parser, lxml or selectolax)")
+    parse_once.add_argument('--save', action='store_true', help="Also write data/whiskey_data.json")
+    commands.add_parser('bench', help="Run the benchmarks (other arguments are passed to bench.py)")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    args.command = args.command or CLUSTER_ROLE or 'run'
+    if args.command not in COMMANDS:
+        parser.error(f"unknown command {args.command}")
+    if args.command == 'bench':
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if args.command == 'bot' and not hasattr(args, 'broker'):
+        args.broker = BROKER_ADDRESS  # CLUSTER_ROLE=bot without a subcommand
+
+    # Parse the scraping configuration up front: a typo should stop the process with a clear
+    # message, not kill a scraper thread while the bot keeps running
+    try:
+        if args.command in ('run', 'scraper', 'broker'):
+            args.targets = scrape_targets()
+        if args.command in ('run', 'scraper', 'node'):
+            args.policy = create_policy()
+        if args.command == 'broker':
+            from cluster import LOOPBACK_HOSTS
+            args.address = broker_address()
+            if not CLUSTER_SECRET and args.address[0] not in LOOPBACK_HOSTS:
+                raise ValueError(f"set CLUSTER_SECRET to run the broker on {args.address[0]}, or bind it to 127.0.0.1")
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Configure logging once for the whole process; the CLI tools and startup checks stay quiet
+    # on stderr and leave no log files or listening ports behind
+    if args.check_startup or args.command in ('parse-once', 'bench'):
+        configure_logging(level=logging.WARNING)
+    else:
+        configure_logging(args.command)
+        start_observability()
+
+    COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Upper bounds (seconds) of the stage timing buckets, from a fast parse up to a slow Chrome start
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _label_string(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+class Counter:
+    """Monotonically increasing count, per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            return [f"{self.name}{_label_string(key)} {value}" for key, value in self.values.items()]
+
+class Gauge(Counter):
+    """Value that can go up and down, per label set."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = value
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}  # label key -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for key, series in self.values.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_string(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_label_string(key + (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_string(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_string(key)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram('whiskey_stage_seconds', 'Time spent in each stage of a scrape or alert')
+STAGE_FAILURES = REGISTRY.counter('whiskey_stage_failures_total', 'Stages that raised an exception')
+NAVIGATION_FAILURES = REGISTRY.counter('whiskey_navigation_failures_total', 'Failed navigation attempts per strategy')
+BROWSER_RSS_BYTES = REGISTRY.gauge('whiskey_browser_rss_bytes', 'Resident memory of chromedriver and its Chrome processes')
+POLL_DECISIONS = REGISTRY.counter('whiskey_poll_decisions_total', 'Adaptive scheduler decisions per reason')
+POLL_INTERVAL_SECONDS = REGISTRY.gauge('whiskey_poll_interval_seconds', 'Next poll interval chosen per target')
+POLL_BUDGET_DELAYS = REGISTRY.counter('whiskey_poll_budget_delays_total', 'Polls held back by the hourly request budget')
+FETCH_FAILURES = REGISTRY.counter('whiskey_fetch_failures_total', 'Failed fetches per target and failure reason')
+CIRCUIT_OPEN = REGISTRY.gauge('whiskey_circuit_open', 'Whether a target\'s circuit breaker is open (1) or not (0)')
+IDENTITIES_QUARANTINED = REGISTRY.gauge('whiskey_identities_quarantined', 'Session identities currently quarantined')
+STARTUP_SECONDS = REGISTRY.gauge('whiskey_startup_seconds', 'Seconds from process start until the command was ready')
+
+_trace_file = None
+_trace_lock = threading.Lock()
+
+def enable_trace(path):
+    """Also append every timed stage as a JSON line to path, for offline analysis."""
+    global _trace_file
+    with _trace_lock:
+        _trace_file = open(path, 'a', encoding='utf-8', buffering=1)
+
+def _trace(stage, seconds, ok, labels):
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.write(json.dumps({'ts': round(time.time(), 3), 'stage': stage, 'seconds': round(seconds, 6), 'ok': ok, **labels}) + '\n')
+
+@contextmanager
+def timed(stage, **labels):
+    """
+    Time a stage (usable as a `with` block or a decorator) and count it as failed if it raises.
+
+    Args:
+        stage (str): Stage name, e.g. 'setup_driver' or 'parse'
+    """
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        STAGE_FAILURES.inc(stage=stage, **labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, **labels)
+        _trace(stage, seconds, ok, labels)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves REGISTRY on /metrics."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the log
+
+def start_metrics_server(port=9108, host='127.0.0.1'):
+    """Serve the metrics endpoint from a background thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,355 @@
+import os
+import heapq
+import random
+import logging
+import threading
+import time
+from datetime import datetime
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from html_parser import ParseCache, parse_whiskey_html, save_whiskey_data
+from fetchers import WHISKEY_RELEASE_URL
+from storage import write_file_atomic
+from metrics import POLL_DECISIONS, POLL_INTERVAL_SECONDS, POLL_BUDGET_DELAYS
+
+# A page to watch. interval/jitter are in seconds; each poll is scheduled interval +/- jitter after the last.
+ScrapeTarget = namedtuple('ScrapeTarget', ['name', 'url', 'interval', 'jitter'])
+
+DEFAULT_TARGETS = [ScrapeTarget('whiskey-release', WHISKEY_RELEASE_URL, 75, 15)]
+
+def _parse_seconds(text, entry):
+    try:
+        seconds = float(text)
+    except ValueError:
+        raise ValueError(f"Scrape target {entry!r} has an invalid number of seconds {text!r}") from None
+    if seconds < 0:
+        raise ValueError(f"Scrape target {entry!r} has a negative number of seconds {text!r}")
+    return seconds
+
+def parse_targets(target_string, interval=75, jitter=15):
+    """
+    Parse "name=url,name2=url2" (e.g. from an environment variable) into ScrapeTargets.
+    An entry can override the timing with "name=url|interval|jitter". Raises ValueError for
+    entries that can't be parsed.
+    """
+    targets = []
+    for entry in target_string.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, spec = entry.partition('=')
+        parts = [part.strip() for part in spec.split('|')]
+        if not name.strip() or not parts[0] or len(parts) > 3:
+            raise ValueError(f"Scrape target {entry!r} should look like name=url[|interval[|jitter]]")
+        targets.append(ScrapeTarget(
+            name.strip(),
+            parts[0],
+            _parse_seconds(parts[1], entry) if len(parts) > 1 else interval,
+            _parse_seconds(parts[2], entry) if len(parts) > 2 else jitter
+        ))
+    return targets
+
+# Times when drops are expected. weekdays uses datetime.weekday() numbers (Monday is 0) and are the
+# days the window starts on; start/end are datetime.time. A window whose end is not after its start
+# runs past midnight into the next day.
+DropWindow = namedtuple('DropWindow', ['weekdays', 'start', 'end'])
+
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+def _parse_clock(text, entry):
+    try:
+        return datetime.strptime(text.strip(), '%H:%M').time()
+    except ValueError:
+        raise ValueError(f"Drop window {entry!r} has an invalid time {text.strip()!r}, expected HH:MM") from None
+
+def _parse_weekday(text, entry):
+    day = text.strip().lower()[:3]
+    if day not in WEEKDAY_NAMES:
+        raise ValueError(f"Drop window {entry!r} has an unknown day {text.strip()!r}")
+    return WEEKDAY_NAMES.index(day)
+
+def parse_drop_windows(window_string):
+    """
+    Parse "Mon,Wed@09:00-11:00;Fri@22:00-02:00" into DropWindows. Leaving out the days
+    ("9:00-11:00") means every day. Raises ValueError for entries that can't be parsed.
+    """
+    windows = []
+    for entry in window_string.split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        days, _, hours = entry.rpartition('@')
+        if hours.count('-') != 1:
+            raise ValueError(f"Drop window {entry!r} should look like [Mon,Thu@]HH:MM-HH:MM")
+        start, end = (_parse_clock(part, entry) for part in hours.split('-'))
+        if start == end:
+            raise ValueError(f"Drop window {entry!r} starts and ends at the same time")
+        weekdays = {_parse_weekday(day, entry) for day in days.split(',')} if days else set(range(7))
+        windows.append(DropWindow(frozenset(weekdays), start, end))
+    return windows
+
+class AdaptivePolicy:
+    """
+    Decides how long to wait before polling a target again.
+
+    Targets are polled every min_interval during drop windows and right after a change. Every
+    quiet poll after that multiplies the target's own interval by backoff, up to max_interval.
+    A global requests-per-hour budget holds polls back when it runs out. Every decision is
+    counted in metrics.
+    """
+
+    def __init__(self, min_interval=15, max_interval=900, backoff=1.5, drop_windows=(), requests_per_hour=None):
+        """
+        Args:
+            min_interval (float): Seconds between polls during drop windows and after changes
+            max_interval (float): Longest wait during quiet periods
+            backoff (float): Factor the interval grows by with every quiet poll
+            drop_windows (list): DropWindows during which to poll at min_interval
+            requests_per_hour (int): Global poll budget across all targets (None for no limit)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.drop_windows = list(drop_windows)
+        self.requests_per_hour = requests_per_hour
+
+        self.quiet_polls = {}  # target name -> polls since the last change
+        self.recent_requests = deque()  # Monotonic times of polls in the last hour
+        self.metrics = {
+            'polls_total': 0,
+            'changes_total': 0,
+            'budget_delays_total': 0,
+            'decisions_total': {'drop-window': 0, 'recent-change': 0, 'backoff': 0},
+            'next_interval_seconds': {},  # target name -> last decided interval
+        }
+
+    def in_drop_window(self, moment=None):
+        """Check whether a wall-clock moment (now by default) falls in a drop window."""
+        moment = moment or datetime.now()
+        clock, weekday = moment.time(), moment.weekday()
+        for window in self.drop_windows:
+            if window.start < window.end:
+                if weekday in window.weekdays and window.start <= clock < window.end:
+                    return True
+            # Past midnight: the evening part is on a window day, the early hours on the day after
+            elif (weekday in window.weekdays and clock >= window.start) or \
+                    ((weekday - 1) % 7 in window.weekdays and clock < window.end):
+                return True
+        return False
+
+    def record_request(self, now):
+        """Count a poll against the hourly budget."""
+        self.recent_requests.append(now)
+        self.metrics['polls_total'] += 1
+
+    def budget_available_at(self, now):
+        """Earliest monotonic time at which the hourly budget allows another poll."""
+        while self.recent_requests and self.recent_requests[0] <= now - 3600:
+            self.recent_requests.popleft()
+        if self.requests_per_hour is None or len(self.recent_requests) < self.requests_per_hour:
+            return now
+        return self.recent_requests[0] + 3600
+
+    def next_interval(self, target, changed):
+        """
+        Seconds to wait before polling target again.
+
+        Args:
+            target (ScrapeTarget): Target that was just polled
+            changed (bool): Whether its listing changed on this poll
+        """
+        if changed:
+            self.quiet_polls[target.name] = 0
+            self.metrics['changes_total'] += 1
+        else:
+            self.quiet_polls[target.name] = self.quiet_polls.get(target.name, 0) + 1
+        quiet_polls = self.quiet_polls[target.name]
+
+        if self.in_drop_window():
+            reason, interval = 'drop-window', self.min_interval
+        elif quiet_polls == 0:
+            reason, interval = 'recent-change', self.min_interval
+        else:
+            reason = 'backoff'
+            interval = min(self.max_interval, max(self.min_interval, target.interval * self.backoff ** (quiet_polls - 1)))
+
+        self.metrics['decisions_total'][reason] += 1
+        self.metrics['next_interval_seconds'][target.name] = interval
+        POLL_DECISIONS.inc(reason=reason)
+        POLL_INTERVAL_SECONDS.set(interval, target=target.name)
+        logging.info(f"Next poll of {target.name} in {interval:.0f}s ({reason})")
+        return interval
+
+class ScrapeScheduler:
+    """
+    Polls several pages on their own intervals over a bounded pool of worker sessions and
+    merges the parsed cards into a single snapshot.
+
+    Each worker thread lazily creates its own session (anything with a fetch(url) method that
+    returns HTML or None, e.g. a persistent WhiskeyScraper or an HttpFetcher), so sessions are
+    never shared between threads.
+    """
+
+    def __init__(self, targets, session_factory, workers=2, on_snapshot=None, engine=None, policy=None, history=None,
+                 on_result=None, merge=True):
+        """
+        Args:
+            targets (list): ScrapeTargets to poll
+            session_factory (callable): Returns a new session for a worker thread
+            workers (int): Maximum number of pages fetched at once
+            on_snapshot (callable): Called with the merged whiskey data whenever it changes
+            engine (str): Parser engine passed to parse_whiskey_html
+            policy (AdaptivePolicy): Adapts poll intervals to activity (fixed target intervals if None)
+            history (HistoryStore): Records per-product changes and page versions
+            on_result (callable): Called with (target, whiskey data) whenever one target's result changes
+            merge (bool): Merge, save and report the combined snapshot (off when another process merges)
+        """
+        self.targets = list(targets)
+        self.session_factory = session_factory
+        self.workers = workers
+        self.on_snapshot = on_snapshot
+        self.engine = engine
+        self.policy = policy
+        self.history = history
+        self.on_result = on_result
+        self.merge = merge
+
+        self.caches = {target.name: ParseCache() for target in self.targets}
+        self.results = {}  # target name -> last parse result
+        self.snapshot = None
+
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.session_factory()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _next_due(self, target, now, changed):
+        interval = self.policy.next_interval(target, changed) if self.policy else target.interval
+        # Jitter scales with the interval so backed-off polls don't line up
+        jitter = target.jitter * interval / target.interval if target.interval else target.jitter
+        return now + max(0.0, interval + random.uniform(-jitter, jitter))
+
+    def scrape_target(self, target):
+        """Fetch and parse one target on the calling worker's session. Returns the parse result or None."""
+        html_content = self._session().fetch(target.url)
+        if html_content is None:
+            logging.warning(f"No page fetched for target {target.name}")
+            return None
+
+        cache = self.caches[target.name]
+        previous_hash = cache.region_hash
+        whiskey_data = parse_whiskey_html(html_content, cache=cache, engine=self.engine, save_json=False)
+
+        # Pages are only written out when their listing changed
+        if cache.region_hash is None or cache.region_hash != previous_hash:
+            self.save_page(target, html_content)
+            if self.history:
+                self.history.record_page(target.name, cache.region_hash, html_content)
+        return whiskey_data
+
+    def save_page(self, target, html_content):
+        """Save a target's HTML to the data directory (whiskey_page.html for the release page)."""
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+        os.makedirs(data_dir, exist_ok=True)
+
+        file_name = 'whiskey_page.html' if target.url == WHISKEY_RELEASE_URL else f'{target.name}_page.html'
+        write_file_atomic(os.path.join(data_dir, file_name), html_content)
+
+    def merge_results(self):
+        """
+        Merge the latest result of every target into one snapshot, save it and report it.
+        Returns the snapshot (the previous list object if nothing changed).
+        """
+        merged = []
+        for target in self.targets:
+            merged.extend(self.results.get(target.name) or [])
+
+        if merged == self.snapshot:
+            return self.snapshot
+
+        self.snapshot = merged
+        save_whiskey_data(merged)
+        logging.info(f"Merged {len(merged)} whiskey items from {len(self.results)} targets")
+        if self.history:
+            self.history.record_snapshot(merged)
+        if self.on_snapshot:
+            self.on_snapshot(merged)
+        return merged
+
+    def run(self, stop_event=None, max_polls=None):
+        """
+        Poll targets until stop_event is set (or max_polls pages have been fetched).
+
+        Args:
+            stop_event (threading.Event): Set it to stop the scheduler
+            max_polls (int): Stop after this many completed polls (None to run forever)
+        """
+        stop_event = stop_event or threading.Event()
+        due = [(time.monotonic(), index, target) for index, target in enumerate(self.targets)]
+        heapq.heapify(due)
+        in_flight = {}
+        polls = 0
+
+        logging.info(f"Scheduling {len(self.targets)} targets over {self.workers} workers")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scrape') as executor:
+            while not stop_event.is_set() and (max_polls is None or polls < max_polls):
+                now = time.monotonic()
+                while due and due[0][0] <= now and len(in_flight) < self.workers:
+                    available_at = self.policy.budget_available_at(now) if self.policy else now
+                    if available_at > now:
+                        # Out of hourly budget, hold the target back until there's room
+                        _, index, target = heapq.heapreplace(due, (available_at, due[0][1], due[0][2]))
+                        self.policy.metrics['budget_delays_total'] += 1
+                        POLL_BUDGET_DELAYS.inc()
+                        continue
+                    _, index, target = heapq.heappop(due)
+                    if self.policy:
+                        self.policy.record_request(now)
+                    in_flight[executor.submit(self.scrape_target, target)] = (index, target)
+
+                timeout = max(0.0, due[0][0] - now) if due and len(in_flight) < self.workers else None
+                if not in_flight:
+                    stop_event.wait(timeout)
+                    continue
+
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                changed = False
+                for future in done:
+                    index, target = in_flight.pop(future)
+                    polls += 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"Scrape of target {target.name} failed: {e}")
+                        result = None
+                    target_changed = result is not None and result is not self.results.get(target.name)
+                    if target_changed:
+                        self.results[target.name] = result
+                        changed = True
+                        if self.on_result:
+                            self.on_result(target, result)
+                    heapq.heappush(due, (self._next_due(target, time.monotonic(), target_changed), index, target))
+
+                if changed and self.merge:
+                    self.merge_results()
+
+            # Let running fetches finish before the sessions are closed
+            wait(in_flight)
+
+        self.close()
+
+    def close(self):
+        """Close every worker session."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            if hasattr(session, 'close'):
+                session.close()
@@ -1,8 +1,6 @@
 import os
 import time
-import random
 import logging
-from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -10,36 +8,75 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from html_parser import parse_whiskey_html
-
-# Configure logging
-logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-os.makedirs(logs_dir, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(logs_dir, "scraper.log")),
-        logging.StreamHandler()
-    ]
-)
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from fetchers import HOME_URL, WHISKEY_RELEASE_URL, DEFAULT_HEADERS
+from metrics import timed, NAVIGATION_FAILURES, BROWSER_RSS_BYTES
+
+AGE_VERIFICATION_XPATH = "/html/body/div[1]/header/section/div[3]/div[3]/div/div/div/div/div[3]/button"
+NAVIGATION_DROPDOWN_XPATH = '//*[@id="root"]/header/section/div[3]/div[1]/section[2]/div[1]/section/div/section/div[4]/div'
+WHISKEY_MENU_LINK_XPATH = "//a[@href='whiskey-release/whiskey-release']"
+WHISKEY_LINK_XPATH = "//a[contains(@href, 'whiskey-release')]"
+CARD_LIST_SELECTOR = "h4.card_title_name"  # What parse_whiskey_html reads
+
+# Requests the lean profile blocks: images, fonts and media, plus third-party analytics and ads.
+# First-party scripts and stylesheets are left alone, the cards and menus need them.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*bing.com/bat*", "*bat.bing.com*",
+    "*pinterest.com*", "*tiktok.com*", "*snapchat.com*", "*criteo.*", "*adsrvr.org*", "*quantserve.com*",
+]
+
+# Chrome features a headless scraper never uses
+LEAN_DISABLED_FEATURES = "Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions,CalculateNativeWinOcclusion"
 
 class WhiskeyScraper:
-    def __init__(self):
-        """Initialize the WhiskeyScraper class."""
+    def __init__(self, persistent=False, max_session_age=1800, max_session_scrapes=None, max_browser_rss_mb=1024,
+                 fetchers=None, lean=False, cache_dir=None, user_agent=None, proxy=None):
+        """
+        Initialize the WhiskeyScraper class.
+
+        Args:
+            persistent (bool): Keep the browser and its age-verified cookies alive between scrapes
+            max_session_age (int): Seconds before a persistent browser is recycled
+            max_session_scrapes (int): Scrapes before a persistent browser is recycled (None for no limit)
+            max_browser_rss_mb (int): Browser memory (RSS, in MB) before a persistent browser is recycled
+            fetchers (list): Fast-path fetchers (see fetchers.py) tried in order before the browser
+            lean (bool): Launch Chrome without images, fonts, trackers and unneeded features
+            cache_dir (str): On-disk HTTP cache directory to reuse across browser launches
+            user_agent (str): Browser user agent (DEFAULT_HEADERS' by default)
+            proxy (str): Proxy for the browser, as "host:port" or "scheme://host:port"
+        """
         self.driver = None
         self.wait = None
+        self.persistent = persistent
+        self.max_session_age = max_session_age
+        self.max_session_scrapes = max_session_scrapes
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.fetchers = fetchers or []
+        self.lean = lean
+        self.cache_dir = cache_dir
+        self.user_agent = user_agent or DEFAULT_HEADERS['User-Agent']
+        self.proxy = proxy
+        self.last_failure = None  # Why the last fetch() returned None
+        self.session_started_at = None
+        self.session_scrapes = 0
+        self.age_verified = False
+        self.preferred_strategy = None  # Navigation strategy that worked last, tried first next time
         
     def setup_driver(self, headless=False):
         """Set up Selenium WebDriver with required options."""
         chrome_options = Options()
         
         # Basic configuration
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--window-size=1920,1080")
+        if self.lean:
+            # A smaller viewport means smaller compositor buffers; the menus still render at this width
+            chrome_options.add_argument("--window-size=1280,800")
+        else:
+            chrome_options.add_argument("--start-maximized")
+            chrome_options.add_argument("--window-size=1920,1080")
         
         # Anti-detection measures
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -47,7 +84,7 @@ class WhiskeyScraper:
         chrome_options.add_experimental_option("useAutomationExtension", False)
         
         # User agent and headers
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        chrome_options.add_argument(f"user-agent={self.user_agent}")
         chrome_options.add_argument("accept=text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8")
         chrome_options.add_argument("accept-language=en-US,en;q=0.5")
         
@@ -61,6 +98,16 @@ class WhiskeyScraper:
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
 
+        if self.lean:
+            self._add_lean_options(chrome_options)
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            chrome_options.add_argument(f"--disk-cache-dir={self.cache_dir}")
+
+        if self.proxy:
+            chrome_options.add_argument(f"--proxy-server={self.proxy}")
+
         try:
             # Explicitly specify Chrome path and use absolute path for ChromeDriver
             driver_path = "/usr/local/bin/chromedriver"
@@ -69,10 +116,11 @@ class WhiskeyScraper:
             service = Service(executable_path=driver_path)
             
             # Instantiate Chrome WebDriver with explicit service
-            self.driver = webdriver.Chrome(
-                service=service,
-                options=chrome_options
-            )
+            with timed('setup_driver'):
+                self.driver = webdriver.Chrome(
+                    service=service,
+                    options=chrome_options
+                )
             
             # Increase timeout and add connection retries
             self.driver.set_page_load_timeout(30)  # 30 seconds page load timeout
@@ -82,6 +130,13 @@ class WhiskeyScraper:
             
             # Additional anti-detection measures
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+            if self.lean:
+                self._block_heavy_requests()
+
+            self.session_started_at = time.monotonic()
+            self.session_scrapes = 0
+            self.age_verified = False
             
         except Exception as e:
             logging.error(f"Failed to initialize Chrome driver: {e}")
@@ -89,6 +144,38 @@ class WhiskeyScraper:
             logging.error(f"Driver path: {driver_path}")
             raise
 
+    def _add_lean_options(self, chrome_options):
+        """Options for a small-footprint browser that only loads what the card DOM needs."""
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.default_content_setting_values.geolocation": 2,
+        })
+
+        # Skip background work and features a scraper never uses
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument(f"--disable-features={LEAN_DISABLED_FEATURES}")
+
+        # Memory caps: fewer renderer processes and a smaller V8 heap
+        chrome_options.add_argument("--renderer-process-limit=2")
+        chrome_options.add_argument("--js-flags=--max-old-space-size=256")
+        chrome_options.add_argument("--disk-cache-size=104857600")
+
+    def _block_heavy_requests(self):
+        """Block images, fonts, media and third-party trackers through the DevTools protocol."""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logging.warning(f"Could not set up request blocking: {e}")
+
     def wait_and_click(self, by, locator, timeout=10):
         """
         Wait for an element to be clickable and then click it.
@@ -108,127 +195,339 @@ class WhiskeyScraper:
             logging.warning(f"Failed to click element with {by}: {locator}. Error: {e}")
             raise
 
-    def scrape_page_once(self):
-        """Scrape the whiskey release page once."""
-        if not self.driver:
-            self.setup_driver(headless=True)
-            
+    def _get(self, url):
+        """Load a url in the browser, timing it as the page_load stage."""
+        with timed('page_load'):
+            self.driver.get(url)
+
+    def close(self):
+        """Quit the browser session, if one is running."""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logging.warning(f"Error while closing the browser session: {e}")
+        self.driver = None
+        self.wait = None
+        self.session_started_at = None
+        self.session_scrapes = 0
+        self.age_verified = False
+
+    def _session_healthy(self):
+        """Check that the browser is still responsive and within its age/memory budget."""
         try:
-            # Navigate to main page with explicit wait
-            self.driver.get("http://www.finewineandgoodspirits.com/")
-            time.sleep(2)  # Allow initial page load
-            
-            # Handle age verification popup with explicit wait
+            self.driver.current_url
+            if not self.driver.window_handles:
+                raise Exception("no open windows")
+        except Exception as e:
+            logging.warning(f"Browser health check failed: {e}")
+            return False
+
+        session_age = time.monotonic() - self.session_started_at
+        if self.max_session_age is not None and session_age > self.max_session_age:
+            logging.info(f"Browser session is {session_age:.0f}s old, recycling")
+            return False
+
+        if self.max_session_scrapes is not None and self.session_scrapes >= self.max_session_scrapes:
+            logging.info(f"Browser session served {self.session_scrapes} scrapes, recycling")
+            return False
+
+        rss_mb = self._sample_browser_rss()
+        if self.max_browser_rss_mb is not None and rss_mb is not None and rss_mb > self.max_browser_rss_mb:
+            logging.info(f"Browser is using {rss_mb:.0f} MB, recycling")
+            return False
+
+        return True
+
+    def _sample_browser_rss(self):
+        """Record the browser's memory in metrics and return it in MB (None if it can't be read)."""
+        rss_mb = self.browser_rss_mb()
+        if rss_mb is not None:
+            BROWSER_RSS_BYTES.set(rss_mb * 1024 * 1024)
+        return rss_mb
+
+    def browser_rss_mb(self):
+        """
+        Return the resident memory (in MB) of chromedriver and every Chrome process under it.
+        Returns None when the process tree cannot be read (e.g. outside Linux).
+        """
+        try:
+            root_pid = self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+        children = {}
+        try:
+            for entry in os.listdir('/proc'):
+                if not entry.isdigit():
+                    continue
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, ValueError, IndexError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        except OSError:
+            return None
+
+        total_kb = 0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            stack.extend(children.get(pid, []))
             try:
-                age_verification_xpath = "/html/body/div[1]/header/section/div[3]/div[3]/div/div/div/div/div[3]/button"
-                self.wait_and_click(By.XPATH, age_verification_xpath)
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            break
+            except OSError:
+                continue
+        return total_kb / 1024
+
+    def _load_release_page_from_home(self, url=WHISKEY_RELEASE_URL):
+        """
+        Go through the homepage, age verification and site navigation to reach the release page
+        (or, for any other url, go there directly once age verification is done).
+        Returns False if the page could not be reached.
+        """
+        # Navigate to main page and wait until it's usable rather than for a fixed time
+        self._get(HOME_URL)
+        ready = self._wait_for_any({
+            'age_gate': lambda d: d.find_elements(By.XPATH, AGE_VERIFICATION_XPATH),
+            'navigation': lambda d: self._document_complete() and d.find_elements(By.XPATH, WHISKEY_LINK_XPATH),
+        })
+
+        # Handle age verification popup with explicit wait
+        if ready == 'age_gate':
+            try:
+                with timed('age_verification'):
+                    self.wait_and_click(By.XPATH, AGE_VERIFICATION_XPATH)
             except Exception as e:
                 logging.warning(f"Age verification handling failed: {e}")
 
-            # Navigate to whiskey release page with more robust method
-            try:
-                # Try multiple strategies for navigation
+        if url != WHISKEY_RELEASE_URL:
+            self._get(url)
+            self._wait_for_cards()
+            return True
+
+        # Navigate to whiskey release page with more robust method
+        try:
+            # Try multiple strategies for navigation
+            with timed('navigate_to_whiskey_page'):
                 self.navigate_to_whiskey_page()
-                
-            except Exception as e:
-                logging.warning(f"Navigation failed with primary method: {e}")
-                # Fallback to direct URL navigation
-                try:
-                    self.driver.get("http://www.finewineandgoodspirits.com/whiskey-release/whiskey-release")
-                except Exception as direct_nav_error:
-                    logging.error(f"Direct URL navigation failed: {direct_nav_error}")
-                    return
 
-            # Get and save the page content
-            html_content = self.driver.page_source
-            timestamp = datetime.now().strftime("%m/%d/%y %H:%M:%S")
+        except Exception as e:
+            logging.warning(f"Navigation failed with primary method: {e}")
+            # Fallback to direct URL navigation
+            try:
+                self._get(WHISKEY_RELEASE_URL)
+            except Exception as direct_nav_error:
+                logging.error(f"Direct URL navigation failed: {direct_nav_error}")
+                return False
 
-            # Save HTML to the data directory
-            data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-            os.makedirs(data_dir, exist_ok=True)
+        self._wait_for_cards()
+        return True
 
-            file_path = os.path.join(data_dir, 'whiskey_page.html')
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+    def _reload_release_page(self, url=WHISKEY_RELEASE_URL):
+        """
+        Reload a page in an already age-verified session.
+        Returns False if the age gate keeps coming back after being dismissed.
+        """
+        if self.driver.current_url.rstrip('/') == url.rstrip('/'):
+            self.driver.refresh()
+        else:
+            self._get(url)
 
-            logging.info(f"HTML content saved to 'whiskey_page.html' at {timestamp}")
+        # The age gate only comes back if the cookie was dropped
+        if self._wait_for_cards(watch_age_gate=True) == 'age_gate':
+            logging.info("Age verification prompt reappeared, dismissing it again")
+            with timed('age_verification'):
+                self.wait_and_click(By.XPATH, AGE_VERIFICATION_XPATH)
+            self._get(url)
+            if self._wait_for_cards(watch_age_gate=True) == 'age_gate':
+                logging.warning("Age verification prompt keeps reappearing")
+                return False
+        return True
 
-            # Parse HTML content
-            logging.info("Parsing HTML data...")
-            parse_whiskey_html(html_content)
-            logging.info(f"HTML data parsed at {timestamp}")
-            
+    def fetch_page_html(self, url=WHISKEY_RELEASE_URL):
+        """
+        Load a page (the release page by default) in the browser and return its HTML,
+        or None if it couldn't be reached (the reason is left in last_failure).
+
+        In persistent mode the browser is kept open afterwards, and later fetches reload the
+        release page directly instead of going through the homepage and age verification again.
+        """
+        if self.driver and not self._session_healthy():
+            self.close()
+
+        if not self.driver:
+            self.setup_driver(headless=True)
+
+        if self.persistent and self.age_verified:
+            if not self._reload_release_page(url):
+                self.last_failure = 'age_gate'
+                return None
+        elif not self._load_release_page_from_home(url):
+            self.last_failure = 'navigation'
+            return None
+        self.age_verified = True
+        self.session_scrapes += 1
+        # Sampled while the page is loaded, a non-persistent browser is closed before the next health check
+        self._sample_browser_rss()
+
+        # Hand the age-verified cookies to the fast path so it can take over next time
+        cookies = self.driver.get_cookies()
+        for fetcher in self.fetchers:
+            if hasattr(fetcher, 'adopt_browser_cookies'):
+                fetcher.adopt_browser_cookies(cookies)
+
+        return self.driver.page_source
+
+    def _fetch_fast_path(self, url=None):
+        """Try each fast-path fetcher in order. Returns the first valid HTML, or None."""
+        for fetcher in self.fetchers:
+            html_content = fetcher.fetch(url)
+            if html_content is not None:
+                logging.info(f"Fetched {url or 'release page'} with {type(fetcher).__name__}")
+                return html_content
+        return None
+
+    def fetch(self, url=None):
+        """
+        Fetch a page (the release page by default), using the browser only if the fast path fails.
+        Returns the HTML, or None if the page couldn't be fetched, with the reason in last_failure
+        (an HTTP 403/429 from the fast path takes precedence, it's the clearer blocking signal).
+        """
+        self.last_failure = None
+        html_content = self._fetch_fast_path(url)
+        if html_content is not None:
+            return html_content
+        blocked = next((fetcher.last_failure for fetcher in self.fetchers
+                        if getattr(fetcher, 'last_failure', None) in ('http_403', 'http_429')), None)
+
+        try:
+            html_content = self.fetch_page_html(url or WHISKEY_RELEASE_URL)
         except Exception as e:
-            logging.error(f"Scraping failed: {e}")
-            
+            logging.error(f"Browser fetch of {url or WHISKEY_RELEASE_URL} failed: {e}")
+            self.last_failure = 'error'
+            html_content = None
+            # Don't carry a browser in an unknown state into the next scrape
+            self.close()
         finally:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            # Without a persistent session every browser fetch starts from a fresh browser
+            if not self.persistent:
+                self.close()
+
+        if html_content is None:
+            self.last_failure = blocked or self.last_failure
+        return html_content
+
+    def _document_complete(self):
+        return self.driver.execute_script("return document.readyState") == "complete"
 
-    def navigate_to_whiskey_page(self):
+    def _wait_for_any(self, conditions, timeout=15):
+        """
+        Wait until one of several conditions holds and return its name (None on timeout).
+
+        Args:
+            conditions (dict): Name -> callable taking the driver, checked in order on every poll
+            timeout (int): Maximum wait time in seconds
+        """
+        def first_ready(driver):
+            for name, condition in conditions.items():
+                try:
+                    if condition(driver):
+                        return name
+                except WebDriverException:
+                    continue  # Element went stale between polls
+            return False
+
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(first_ready)
+        except TimeoutException:
+            return None
+
+    def _wait_for_cards(self, timeout=15, watch_age_gate=False):
+        """
+        Wait for the whiskey card list to render. Returns 'cards', 'age_gate' (if watched for
+        and it showed up first) or None if neither appeared in time.
+        """
+        conditions = {'cards': lambda d: d.find_elements(By.CSS_SELECTOR, CARD_LIST_SELECTOR)}
+        if watch_age_gate:
+            conditions['age_gate'] = lambda d: d.find_elements(By.XPATH, AGE_VERIFICATION_XPATH)
+        with timed('wait_for_cards'):
+            ready = self._wait_for_any(conditions, timeout)
+        if ready is None:
+            logging.warning(f"No whiskey cards appeared within {timeout}s")
+        return ready
+
+    def navigate_to_whiskey_page(self, timeout=15):
         """
         Attempt to navigate to whiskey release page using multiple strategies.
         Raises an exception if navigation fails.
+
+        The strategies are raced in a single wait: the dropdown, its menu link and any visible
+        whiskey link are all polled together, and whichever link is clickable first is used.
+        Hovering the dropdown only opens its menu, it doesn't hold up the wait, so when the hover
+        fails a direct link is still taken as soon as it appears. Everything shares one timeout,
+        and the strategy that worked last time wins ties.
         """
-        strategies = [
-            self._navigate_through_dropdown,
-            self._click_whiskey_link_directly
-        ]
-        
-        for strategy in strategies:
+        probes = {
+            '_navigate_through_dropdown': self._find_menu_link,
+            '_click_whiskey_link_directly': self._find_visible_whiskey_link,
+        }
+        if self.preferred_strategy in probes:
+            probes = {self.preferred_strategy: probes[self.preferred_strategy], **probes}
+        probes['dropdown'] = self._find_dropdown
+
+        deadline = time.monotonic() + timeout
+        while any(name != 'dropdown' for name in probes):
+            remaining = deadline - time.monotonic()
+            ready = self._wait_for_any(probes, remaining) if remaining > 0 else None
+            if ready is None:
+                break
+            element = probes[ready](self.driver)
+            if element is None:
+                continue  # Gone again between polls
+
+            if ready == 'dropdown':
+                del probes['dropdown']
+                try:
+                    self._open_dropdown(element)
+                except Exception as e:
+                    logging.warning(f"Opening the navigation dropdown failed: {e}")
+                    NAVIGATION_FAILURES.inc(strategy='_navigate_through_dropdown')
+                continue
+
             try:
-                strategy()
-                logging.info(f"Successfully navigated using {strategy.__name__}")
+                element.click()
+                self.preferred_strategy = ready
+                logging.info(f"Successfully navigated using {ready}")
                 return
             except Exception as e:
-                logging.warning(f"Navigation strategy {strategy.__name__} failed: {e}")
+                logging.warning(f"Navigation strategy {ready} failed: {e}")
+                NAVIGATION_FAILURES.inc(strategy=ready)
+                del probes[ready]
         
         raise Exception("All navigation strategies failed")
 
-    def _navigate_through_dropdown(self):
-        """Navigate through dropdown menu."""
-        dropdown_xpath = '//*[@id="root"]/header/section/div[3]/div[1]/section[2]/div[1]/section/div/section/div[4]/div'
-        dropdown = self.wait.until(EC.presence_of_element_located((By.XPATH, dropdown_xpath)))
-        
-        actions = ActionChains(self.driver)
-        actions.move_to_element(dropdown).perform()
-        
-        whiskey_link = self.wait.until(
-            EC.presence_of_element_located((By.XPATH, "//a[@href='whiskey-release/whiskey-release']"))
-        )
-        whiskey_link.click()
-
-    def _click_whiskey_link_directly(self):
-        """Alternative method to find and click whiskey release link."""
-        # Using a more flexible link locator
-        whiskey_link = self.wait.until(
-            EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, 'whiskey-release')]"))
-        )
-        whiskey_link.click()
-
-    def start_scraper(self, iterations=6, min_sleep=60, max_sleep=90):
-        """
-        Start the scraper loop for multiple iterations.
-        
-        Args:
-            iterations (int): Number of scraping iterations.
-            min_sleep (int): Minimum time (in seconds) to sleep between scrapes.
-            max_sleep (int): Maximum time (in seconds) to sleep between scrapes.
-        """
-        logging.info(f"Starting scraper with {iterations} iterations...")
-        for i in range(iterations):
-            try:
-                logging.info(f"Starting iteration {i+1}/{iterations}")
-                self.scrape_page_once()
-                
-                if i < iterations - 1:  # Skip sleep after the last iteration
-                    sleep_time = random.randint(min_sleep, max_sleep)
-                    logging.info(f"Sleeping for {sleep_time} seconds before next iteration...")
-                    time.sleep(sleep_time)
-                    
-            except Exception as e:
-                logging.error(f"Error in iteration {i+1}: {e}")
-                continue  # Continue to next iteration even if current one fails
-                
-        logging.info("Scraping iterations completed")
\ No newline at end of file
+    def _find_dropdown(self, driver):
+        elements = driver.find_elements(By.XPATH, NAVIGATION_DROPDOWN_XPATH)
+        return elements[0] if elements else None
+
+    def _find_clickable(self, driver, xpath):
+        for element in driver.find_elements(By.XPATH, xpath):
+            if element.is_displayed() and element.is_enabled():
+                return element
+        return None
+
+    def _find_menu_link(self, driver):
+        return self._find_clickable(driver, WHISKEY_MENU_LINK_XPATH)
+
+    def _find_visible_whiskey_link(self, driver):
+        return self._find_clickable(driver, WHISKEY_LINK_XPATH)
+
+    def _open_dropdown(self, dropdown):
+        """Hover over the navigation dropdown so its menu links show."""
+        ActionChains(self.driver).move_to_element(dropdown).perform()
@@ -0,0 +1,85 @@
+import os
+import json
+import tempfile
+from metrics import timed
+
+# Read once at import: os.umask() can only be queried by setting it, which isn't thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _new_file_mode(path):
+    """Mode a plain open(path, 'w') would leave: the existing file's, else 0o666 minus the umask."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def write_file_atomic(path, content, encoding='utf-8'):
+    """
+    Write a text file so readers only ever see the old or the new contents, never a partial write.
+    The data goes to a temp file in the same directory, is fsynced, and is renamed over the target
+    with the permissions the target would have had otherwise (mkstemp creates files as 0600).
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _new_file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # Make the rename itself durable (not possible on Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def write_json_atomic(path, data, indent=2):
+    """Atomically write data as JSON (see write_file_atomic)."""
+    write_file_atomic(path, json.dumps(data, indent=indent))
+
+class CachedJsonLoader:
+    """
+    Loads a JSON file, but only reads and decodes it again when it changed on disk.
+
+    Changes are detected from the file's inode, st_mtime_ns and size. Atomic writes replace the
+    inode, so even two writes within the mtime resolution are told apart.
+
+    Attributes:
+        generation (int): Incremented every time a new version of the file is decoded
+    """
+
+    def __init__(self, path, default=None):
+        """
+        Args:
+            path (str): JSON file to load
+            default: Returned while the file doesn't exist
+        """
+        self.path = path
+        self.default = default
+        self.generation = 0
+        self._key = None
+        self._data = None
+
+    def load(self):
+        """Return the decoded file, without any I/O beyond a stat() if it hasn't changed."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self.default
+
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._key:
+            with timed('json_read'), open(self.path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+            self._key = key
+            self.generation += 1
+        return self._data
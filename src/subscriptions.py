@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import bisect
+import logging
+import threading
+from collections import namedtuple
+from identity import name_tokens, parse_price
+from storage import write_json_atomic
+
+# kind is 'dm' (alerts go to owner_id by DM) or 'role' (owner_id is a role mentioned in the alert channels)
+Subscription = namedtuple('Subscription', ['id', 'kind', 'owner_id', 'terms', 'max_price', 'store'])
+
+def tokenize(text):
+    """Tokens of a product name or search, canonicalized the same way as product identities ("15yr" -> "15 year")."""
+    return name_tokens(text)
+
+def default_subscriptions_path():
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, 'subscriptions.json')
+
+class SubscriptionIndex:
+    """
+    Watchlist filters, indexed so a product is matched without scanning every subscription.
+
+    Subscriptions with search terms live in an inverted index from token to subscription ids; a
+    product only touches the postings of the tokens in its name, and a subscription matches when
+    all of its terms were hit. Subscriptions without terms (price or store only) are kept sorted
+    by price ceiling, so the ones a price satisfies are found with a binary search.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): JSON file the subscriptions are persisted to (data/subscriptions.json by default)
+        """
+        self.path = path or default_subscriptions_path()
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.postings = {}  # token -> set of subscription ids
+        self.open_by_price = []  # (max_price or inf, id) for subscriptions without terms
+        self.next_id = 1
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for record in json.load(f):
+                    self._index(Subscription(**dict(record, terms=tuple(record['terms']))))
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def _index(self, subscription):
+        self.subscriptions[subscription.id] = subscription
+        self.next_id = max(self.next_id, subscription.id + 1)
+        if subscription.terms:
+            for term in subscription.terms:
+                self.postings.setdefault(term, set()).add(subscription.id)
+        else:
+            ceiling = subscription.max_price if subscription.max_price is not None else float('inf')
+            bisect.insort(self.open_by_price, (ceiling, subscription.id))
+
+    def _unindex(self, subscription):
+        del self.subscriptions[subscription.id]
+        if subscription.terms:
+            for term in subscription.terms:
+                self.postings[term].discard(subscription.id)
+                if not self.postings[term]:
+                    del self.postings[term]
+        else:
+            ceiling = subscription.max_price if subscription.max_price is not None else float('inf')
+            self.open_by_price.remove((ceiling, subscription.id))
+
+    def _save(self):
+        write_json_atomic(self.path, [subscription._asdict() for subscription in self.subscriptions.values()])
+
+    def add(self, owner_id, terms, max_price=None, store=None, kind='dm'):
+        """
+        Register a filter.
+
+        Args:
+            owner_id (int): User to DM, or role to mention
+            terms (str): Words that must all appear in the product name (may be empty)
+            max_price (float): Only match at or below this price
+            store (str): Only match when the store availability text contains this
+            kind (str): 'dm' or 'role'
+
+        Returns:
+            Subscription
+        """
+        with self.lock:
+            subscription = Subscription(
+                self.next_id, kind, owner_id, tuple(sorted(set(tokenize(terms)))), max_price,
+                store.casefold() if store else None
+            )
+            self._index(subscription)
+            self._save()
+        logging.info(f"Added subscription {subscription}")
+        return subscription
+
+    def remove(self, owner_id, subscription_id):
+        """Remove a subscription, if it belongs to owner_id. Returns whether it was removed."""
+        with self.lock:
+            subscription = self.subscriptions.get(subscription_id)
+            if subscription is None or subscription.owner_id != owner_id:
+                return False
+            self._unindex(subscription)
+            self._save()
+        return True
+
+    def for_owner(self, owner_id):
+        """Subscriptions owned by a user or role."""
+        with self.lock:
+            return [subscription for subscription in self.subscriptions.values() if subscription.owner_id == owner_id]
+
+    def match(self, entry):
+        """
+        Subscriptions a product matches.
+
+        Args:
+            entry (dict): whiskey_info dict
+
+        Returns:
+            list: Matching Subscriptions
+        """
+        price = parse_price(entry)
+        store_text = (entry.get('store_availability') or '').casefold()
+
+        with self.lock:
+            hits = {}
+            for token in set(tokenize(entry.get('name'))):
+                for subscription_id in self.postings.get(token, ()):
+                    hits[subscription_id] = hits.get(subscription_id, 0) + 1
+
+            candidates = [
+                self.subscriptions[subscription_id] for subscription_id, count in hits.items()
+                if count == len(self.subscriptions[subscription_id].terms)
+            ]
+            candidates = [
+                subscription for subscription in candidates
+                if subscription.max_price is None or (price is not None and price <= subscription.max_price)
+            ]
+
+            # Term-less subscriptions whose ceiling is at or above the price (all of them if the price is unknown)
+            start = bisect.bisect_left(self.open_by_price, (price, -1)) if price is not None else len(self.open_by_price)
+            candidates.extend(self.subscriptions[subscription_id] for _, subscription_id in self.open_by_price[start:])
+            if price is None:
+                candidates.extend(
+                    self.subscriptions[subscription_id] for ceiling, subscription_id in self.open_by_price
+                    if ceiling == float('inf')
+                )
+
+        return [subscription for subscription in candidates if not subscription.store or subscription.store in store_text]
+
+    def match_all(self, entries):
+        """
+        Match many products at once.
+
+        Returns:
+            dict: (kind, owner_id) -> list of matched entries, each entry listed once per owner
+        """
+        matches = {}
+        for entry in entries:
+            owners = {(subscription.kind, subscription.owner_id) for subscription in self.match(entry)}
+            for owner in owners:
+                matches.setdefault(owner, []).append(entry)
+        return matches
+
+def parse_watch_query(query):
+    """
+    Parse a !watch query: "<terms> [under <price>] [at <store>]".
+
+    Returns:
+        tuple: (terms, max_price, store)
+    """
+    match = re.match(r'^(?P<terms>.*?)(?:\s*\bunder\s+\$?(?P<price>[\d,]+(?:\.\d+)?))?(?:\s*\bat\s+(?P<store>.+))?$', query.strip(), re.IGNORECASE)
+    terms = match.group('terms').strip()
+    max_price = float(match.group('price').replace(',', '')) if match.group('price') else None
+    store = match.group('store').strip() if match.group('store') else None
+    return terms, max_price, store
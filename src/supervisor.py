@@ -0,0 +1,292 @@
+import time
+import random
+import logging
+import threading
+from collections import namedtuple
+from fetchers import DEFAULT_HEADERS, looks_like_release_page
+from metrics import FETCH_FAILURES, CIRCUIT_OPEN, IDENTITIES_QUARANTINED
+
+# Who a session presents itself as. Each identity gets its own sessions, and so its own cookie jar.
+Identity = namedtuple('Identity', ['name', 'user_agent', 'proxy'])
+
+# Failures that suggest this identity is being blocked rather than the site being down. A page
+# without cards is only suspicious: the next fetch simply goes out as another identity.
+ROTATE_REASONS = {'http_403', 'http_429', 'age_gate'}
+
+def build_identities(user_agents=(), proxies=()):
+    """
+    Pair user agents with proxies (cycling the shorter list) into identities.
+    With neither, a single identity using the default headers and no proxy is returned.
+    """
+    user_agents = list(user_agents) or [DEFAULT_HEADERS['User-Agent']]
+    proxies = list(proxies) or [None]
+    count = max(len(user_agents), len(proxies))
+    return [
+        Identity(f'identity-{index + 1}', user_agents[index % len(user_agents)], proxies[index % len(proxies)])
+        for index in range(count)
+    ]
+
+class Backoff:
+    """Exponential backoff with full jitter: attempt n waits a random time up to base * factor**n (capped)."""
+
+    def __init__(self, base=5, cap=900, factor=2):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * self.factor ** attempt))
+
+class CircuitBreaker:
+    """
+    Stops fetching a target after repeated failures.
+
+    After failure_threshold consecutive failures the breaker opens and fetches are refused
+    until a backoff delay passes. Then a single trial fetch is let through (half open): success
+    closes the breaker, failure opens it again for longer.
+    """
+
+    def __init__(self, name, failure_threshold=3, backoff=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff or Backoff(base=30, cap=1800)
+        self.failures = 0
+        self.openings = 0  # Consecutive times the breaker opened, drives the backoff
+        self.retry_at = None  # Set while open
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.retry_at is None:
+            return 'closed'
+        return 'half_open' if self.trial_in_flight or time.monotonic() >= self.retry_at else 'open'
+
+    def allow(self):
+        """Whether a fetch may go ahead now."""
+        with self.lock:
+            if self.retry_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() < self.retry_at:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.retry_at is not None:
+                logging.info(f"Circuit for {self.name} closed again")
+            self.failures = 0
+            self.openings = 0
+            self.retry_at = None
+            self.trial_in_flight = False
+        CIRCUIT_OPEN.set(0, target=self.name)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.retry_at is None and self.failures < self.failure_threshold:
+                return
+            delay = self.backoff.delay(self.openings)
+            self.openings += 1
+            self.retry_at = time.monotonic() + delay
+        logging.warning(f"Circuit for {self.name} open after {self.failures} failures, retrying in {delay:.0f}s")
+        CIRCUIT_OPEN.set(1, target=self.name)
+
+class IdentityPool:
+    """
+    Hands out identities and quarantines the ones that get blocked. A worker keeps its identity
+    until it's quarantined or asked to rotate; new ones are the least recently used. Each
+    quarantine of the same identity lasts longer (exponential backoff with jitter).
+    """
+
+    def __init__(self, identities, backoff=None):
+        self.identities = list(identities)
+        self.backoff = backoff or Backoff(base=300, cap=6 * 3600)
+        self.last_used = {identity: 0.0 for identity in self.identities}
+        self.strikes = {identity: 0 for identity in self.identities}
+        self.quarantine = {}  # identity -> (release time, reason)
+        self.lock = threading.Lock()
+
+    def acquire(self, current=None, rotate=False):
+        """
+        Identity to fetch as, or None if all of them are quarantined.
+
+        Args:
+            current (Identity): The worker's identity so far, kept if it isn't quarantined
+            rotate (bool): Move away from current to the least recently used other identity
+                (current is still returned if it's the only one available)
+        """
+        now = time.monotonic()
+        with self.lock:
+            for identity, (release_at, _) in list(self.quarantine.items()):
+                if release_at <= now:
+                    del self.quarantine[identity]
+                    logging.info(f"{identity.name} released from quarantine")
+            IDENTITIES_QUARANTINED.set(len(self.quarantine))
+
+            available = [identity for identity in self.identities if identity not in self.quarantine]
+            if not available:
+                return None
+            if current in available and not rotate:
+                identity = current
+            else:
+                identity = min([other for other in available if other != current] or available, key=self.last_used.get)
+            self.last_used[identity] = now
+            return identity
+
+    def report_success(self, identity):
+        with self.lock:
+            self.strikes[identity] = 0
+
+    def report_blocked(self, identity, reason):
+        """Quarantine an identity that hit a blocking signal."""
+        with self.lock:
+            delay = self.backoff.delay(self.strikes[identity])
+            self.strikes[identity] += 1
+            self.quarantine[identity] = (time.monotonic() + delay, reason)
+            IDENTITIES_QUARANTINED.set(len(self.quarantine))
+        logging.warning(f"Quarantined {identity.name} for {delay:.0f}s after {reason}")
+
+    def quarantined(self):
+        """Currently quarantined identities, as {name: (seconds left, reason)}."""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                identity.name: (max(0.0, release_at - now), reason)
+                for identity, (release_at, reason) in self.quarantine.items()
+            }
+
+class FetchSupervisor:
+    """
+    Wraps fetch sessions with per-target circuit breakers and identity rotation.
+
+    Breakers and the identity pool are shared; sessions are not. Each scheduler worker gets its
+    own SupervisedSession from session(), which sticks to one identity and one real session
+    (created through session_factory(identity)) until that identity is quarantined or a page
+    without cards asks for another one; the old session is closed on the switch. A blocked
+    identity thus starts over with a fresh cookie jar when it comes out of quarantine.
+    """
+
+    def __init__(self, session_factory, identities=None, failure_threshold=3, breaker_backoff=None,
+                 quarantine_backoff=None, confirm_empty=3):
+        """
+        Args:
+            session_factory (callable): Takes an Identity and returns a session with fetch(url)
+            identities (list): Identities to rotate through (see build_identities)
+            failure_threshold (int): Consecutive failures of a target before its breaker opens
+            breaker_backoff (Backoff): How long an open breaker waits before a trial fetch
+            quarantine_backoff (Backoff): How long a blocked identity is quarantined
+            confirm_empty (int): Consecutive pages without cards (identities are used in rotation)
+                before an empty listing is believed; it's then returned as is until cards reappear
+        """
+        self.session_factory = session_factory
+        self.pool = IdentityPool(identities or build_identities(), quarantine_backoff)
+        self.failure_threshold = failure_threshold
+        self.breaker_backoff = breaker_backoff
+        self.confirm_empty = confirm_empty
+        self.breakers = {}
+        self.empty_pages = {}  # url -> consecutive pages without cards
+        self.confirmed_empty = set()  # urls whose listing is known to be empty
+        self.lock = threading.Lock()
+
+    def breaker(self, url):
+        with self.lock:
+            breaker = self.breakers.get(url)
+            if breaker is None:
+                breaker = self.breakers[url] = CircuitBreaker(url, self.failure_threshold, self.breaker_backoff)
+            return breaker
+
+    def session(self):
+        """A session for one worker thread (pass this method to ScrapeScheduler as the session factory)."""
+        return SupervisedSession(self)
+
+    def _classify(self, url, session, html_content):
+        """Failure reason for a fetch result, or None if it's good to use."""
+        if html_content is None:
+            return getattr(session, 'last_failure', None) or 'error'
+        with self.lock:
+            if looks_like_release_page(html_content):
+                self.empty_pages.pop(url, None)
+                self.confirmed_empty.discard(url)
+                return None
+            if url in self.confirmed_empty:
+                return None
+            self.empty_pages[url] = self.empty_pages.get(url, 0) + 1
+            if self.empty_pages[url] < self.confirm_empty:
+                return 'empty'
+            del self.empty_pages[url]
+            self.confirmed_empty.add(url)
+        logging.info(f"{url} had no cards {self.confirm_empty} times in a row, treating the listing as empty")
+        return None
+
+class SupervisedSession:
+    """One worker's view of a FetchSupervisor, with the same fetch(url)/close() interface as a session."""
+
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+        self.sessions = {}  # identity -> session (only the current identity's is kept open)
+        self.identity = None
+        self.rotate = False  # Switch identity on the next fetch
+        self.last_failure = None
+
+    def fetch(self, url=None):
+        """
+        Fetch a page unless its breaker is open or every identity is quarantined.
+        Returns the HTML, or None (see last_failure for why).
+        """
+        supervisor = self.supervisor
+        breaker = supervisor.breaker(url)
+        if not breaker.allow():
+            self.last_failure = 'circuit_open'
+            logging.info(f"Skipping {url}, its circuit is open")
+            return None
+
+        identity = supervisor.pool.acquire(self.identity, self.rotate)
+        if identity is None:
+            self.last_failure = 'no_identity'
+            logging.warning(f"Every identity is quarantined, skipping {url}")
+            breaker.record_failure()
+            return None
+
+        if identity != self.identity:
+            if self.identity is not None:
+                self._close_session(self.identity)
+            self.identity = identity
+        self.rotate = False
+
+        session = self.sessions.get(identity)
+        if session is None:
+            session = self.sessions[identity] = supervisor.session_factory(identity)
+
+        try:
+            html_content = session.fetch(url)
+            reason = supervisor._classify(url, session, html_content)
+        except Exception as e:
+            logging.error(f"Fetch of {url} as {identity.name} failed: {e}")
+            reason = 'error'
+
+        self.last_failure = reason
+        if reason is None:
+            breaker.record_success()
+            supervisor.pool.report_success(identity)
+            return html_content
+
+        FETCH_FAILURES.inc(target=url, reason=reason)
+        breaker.record_failure()
+        if reason in ROTATE_REASONS:
+            supervisor.pool.report_blocked(identity, reason)
+            self._close_session(identity)
+        elif reason == 'empty':
+            self.rotate = True
+        return None
+
+    def _close_session(self, identity):
+        session = self.sessions.pop(identity, None)
+        if session is not None and hasattr(session, 'close'):
+            session.close()
+
+    def close(self):
+        for identity in list(self.sessions):
+            self._close_session(identity)
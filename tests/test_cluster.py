@@ -0,0 +1,57 @@
+import socket
+import pytest
+import threading
+from cluster import Broker, Connection, hello, subscribe_snapshots
+from scheduler import ScrapeTarget
+
+SECRET = 'swordfish'
+
+def start_broker():
+    broker = Broker([ScrapeTarget('releases', 'http://example.invalid/', 60, 0)], port=0, secret=SECRET)
+    return broker.start()
+
+def subscribe(broker, secret):
+    snapshots = []
+    received = threading.Event()
+    stop = threading.Event()
+
+    def on_snapshot(data):
+        snapshots.append(data)
+        received.set()
+
+    thread = threading.Thread(target=subscribe_snapshots, args=(broker.address, on_snapshot, stop), kwargs={'secret': secret}, daemon=True)
+    thread.start()
+    return snapshots, received, stop
+
+def test_hello_carries_the_secret_only_when_set():
+    assert hello('bot') == {'type': 'hello', 'role': 'bot'}
+    assert hello('node', SECRET, node='east') == {'type': 'hello', 'role': 'node', 'node': 'east', 'secret': SECRET}
+
+def test_clients_without_the_secret_are_rejected():
+    broker = start_broker()
+    try:
+        for message in (hello('node', 'wrong', node='intruder'), hello('bot')):
+            connection = Connection(socket.create_connection(broker.address, timeout=5))
+            connection.send([message])
+            assert connection.receive() is None  # Closed without a reply
+            connection.close()
+        assert broker.nodes == {} and broker.bots == set()
+    finally:
+        broker.shutdown()
+
+def test_bot_with_the_secret_gets_the_current_snapshot():
+    broker = start_broker()
+    try:
+        broker.snapshot = [{'name': 'Weller 12 Year'}]
+        snapshots, received, stop = subscribe(broker, secret=SECRET)
+
+        assert received.wait(5)
+        assert snapshots == [[{'name': 'Weller 12 Year'}]]
+        stop.set()
+    finally:
+        broker.shutdown()
+
+def test_broker_needs_a_secret_beyond_loopback():
+    with pytest.raises(ValueError):
+        Broker([], host='0.0.0.0', port=0)
+    Broker([], host='127.0.0.1', port=0).server.server_close()
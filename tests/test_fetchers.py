@@ -0,0 +1,60 @@
+import os
+import pytest
+from fetchers import HttpFetcher
+from fixture_server import FaultInjectingHandler, FaultPlan, start_fixture_server
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+RELEASE_PATH = '/whiskey-release/whiskey-release'
+
+class CookieRecordingHandler(FaultInjectingHandler):
+    def do_GET(self):
+        self.server.cookies.append(self.headers.get('Cookie'))
+        super().do_GET()
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(faults=()):
+        server, base_url = start_fixture_server(FIXTURES, handler_class=CookieRecordingHandler, fault_plan=FaultPlan(faults))
+        server.cookies = []
+        servers.append(server)
+        return server, base_url + RELEASE_PATH
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_fetches_a_valid_page(serve):
+    _, url = serve()
+    fetcher = HttpFetcher(url=url)
+    html_content = fetcher.fetch()
+    assert 'card_title_name' in html_content
+    assert fetcher.last_failure is None
+
+@pytest.mark.parametrize('fault, reason', [
+    ('empty', 'empty'),
+    ('age_gate', 'empty'),
+    ('403', 'http_403'),
+    ('429', 'http_429'),
+    ('reset', 'error'),
+])
+def test_failures_are_classified(serve, fault, reason):
+    _, url = serve([fault, 'ok'])
+    fetcher = HttpFetcher(url=url, timeout=5)
+    assert fetcher.fetch() is None
+    assert fetcher.last_failure == reason
+
+    assert fetcher.fetch() is not None  # The next request goes through and clears the failure
+    assert fetcher.last_failure is None
+
+def test_sends_adopted_browser_cookies(serve):
+    server, url = serve()
+    fetcher = HttpFetcher(url=url, cookies={'configured': '1'})
+    fetcher.fetch()
+    fetcher.adopt_browser_cookies([{'name': 'age_verified', 'value': 'true', 'domain': '127.0.0.1', 'path': '/'}])
+    fetcher.fetch()
+
+    assert server.cookies[0] == 'configured=1'
+    assert sorted(server.cookies[1].split('; ')) == ['age_verified=true', 'configured=1']
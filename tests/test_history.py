@@ -0,0 +1,11 @@
+from history import HistoryStore
+
+def test_name_queries_match_respellings(tmp_path):
+    history = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    history.record_snapshot([{'name': "Blanton's Gold", 'price': '$99.99', 'quantity_available': '4 left'}], ts=100)
+    history.record_snapshot([{'name': "Blanton's Gold", 'price': '$99.99', 'quantity_available': '1 left'}], ts=3700)
+
+    assert history.last_restock('Blantons Gold') == 100
+    assert history.last_restock('BLANTON’S  GOLD') == 100
+    assert [event['kind'] for event in history.events(name='blantons gold')] == ['added', 'changed']
+    assert history.sell_through_rate('Blantons Gold') == 3.0
@@ -0,0 +1,77 @@
+import os
+import pytest
+from html_parser import (ParseCache, PARSER_ENGINES, _extract_whiskey_data, compare_parser_engines,
+                         engine_available, parse_whiskey_html, split_whiskey_cards)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'whiskey_page.html')
+
+EXPECTED = [
+    {
+        'name': 'Blanton’s Gold Edition',
+        'price': '$119.99',
+        'availability_type': 'Available Online',
+        'store_availability': 'In Stores',
+        'quantity_available': '3 available',
+        'limit': 'Limit 1 per customer',
+    },
+    {
+        'name': 'Elijah Craig Barrel Proof & Rye',
+        'price': '$79.99',
+        'availability_type': None,
+        'store_availability': None,
+        'quantity_available': '12   left',
+        'limit': None,
+    },
+    {
+        'name': 'Weller 12 Year',
+        'price': None,
+        'availability_type': 'Online Only',
+        'store_availability': None,
+        'quantity_available': None,
+        'limit': None,
+    },
+]
+
+@pytest.fixture
+def page():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+@pytest.mark.parametrize('strain', [False, True])
+@pytest.mark.parametrize('engine', PARSER_ENGINES)
+def test_engines_extract_the_expected_cards(page, engine, strain):
+    if not engine_available(engine):
+        pytest.skip(f"{engine} is not installed")
+    assert _extract_whiskey_data(page, engine, strain=strain) == EXPECTED
+
+def test_compare_parser_engines_agrees(page):
+    assert all(compare_parser_engines(page).values())
+
+def test_split_whiskey_cards(page):
+    chunks = split_whiskey_cards(page)
+    assert len(chunks) == len(EXPECTED)  # The promo card has no title
+    assert all(chunk.startswith('<div class="card') and chunk.endswith('</div>') for chunk in chunks)
+    assert [_extract_whiskey_data(chunk)[0] for chunk in chunks] == EXPECTED
+
+def test_split_whiskey_cards_refuses_nested_cards():
+    nested = ('<div class="card"><h4 class="card_title_name">Outer</h4>'
+              '<div class="card"><h4 class="card_title_name">Inner</h4></div></div>')
+    assert split_whiskey_cards(nested) is None
+
+def test_unchanged_page_returns_the_same_list(page):
+    cache = ParseCache()
+    first = parse_whiskey_html(page, cache=cache, save_json=False)
+    assert first == EXPECTED
+    assert parse_whiskey_html(page, cache=cache, save_json=False) is first
+
+def test_one_card_change_matches_a_full_parse(page):
+    cache = ParseCache()
+    parse_whiskey_html(page, cache=cache, save_json=False)
+    unchanged_cards = dict(cache.cards)
+
+    changed = page.replace('3 available', '1 available')
+    result = parse_whiskey_html(changed, cache=cache, save_json=False)
+    assert result == _extract_whiskey_data(changed)
+    assert result[0]['quantity_available'] == '1 available'
+    reused = [fingerprint for fingerprint, cards in cache.cards.items() if unchanged_cards.get(fingerprint) is cards]
+    assert len(reused) == len(EXPECTED) - 1
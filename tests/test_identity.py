@@ -0,0 +1,39 @@
+import pytest
+from identity import ProductResolver, same_words
+from inventory import InventoryStore
+
+@pytest.mark.parametrize('first, second', [
+    ("Blanton's Gold", 'BLANTONS  GOLD'),
+    ('Old Forester 1920', 'OldForester 1920'),
+    ('Weller Special Reserve', 'Weler Special Reserve'),
+    ('Eagle Rare 10 Year', 'Eagle Rare 10yr'),
+])
+def test_spelling_and_spacing_variants_are_merged(first, second):
+    resolver = ProductResolver()
+    assert resolver.resolve(first) == resolver.resolve(second)
+
+@pytest.mark.parametrize('first, second', [
+    ('Elijah Craig Barrel Proof', 'Elijah Craig Barrel Proof Rye'),
+    ("Russell's Reserve Single Barrel", "Russell's Reserve Single Barrel Rye"),
+    ('Weller Special Reserve', 'Weller Reserve'),
+    ('Eagle Rare 10 Year', 'Eagle Rare 12 Year'),
+])
+def test_names_differing_by_a_word_are_kept_apart(first, second):
+    for order in ((first, second), (second, first)):
+        resolver = ProductResolver()
+        assert resolver.resolve(order[0]) != resolver.resolve(order[1])
+
+def test_same_words_rejects_short_word_typos():
+    assert not same_words('four roses rye', 'four roses rum')
+    assert same_words('four roses', 'four rose')
+
+def test_extra_word_bottles_do_not_swap_into_restocks():
+    plain = {'name': 'Elijah Craig Barrel Proof', 'price': '$79.99', 'quantity_available': '2 left'}
+    rye = {'name': 'Elijah Craig Barrel Proof Rye', 'price': '$79.99', 'quantity_available': '5 left'}
+    store = InventoryStore()
+    store.apply_snapshot([plain, rye])
+
+    assert not store.apply_snapshot([dict(rye), dict(plain)])
+    diff = store.apply_snapshot([dict(rye)])
+    assert diff.removed == [plain]
+    assert not diff.restocked
@@ -0,0 +1,29 @@
+from inventory import InventoryStore
+
+def card(store, quantity):
+    return {'name': 'Weller 12 Year', 'price': '$39.99', 'quantity_available': f'{quantity} left', 'store': store}
+
+def test_reordered_duplicate_cards_are_unchanged():
+    store = InventoryStore()
+    store.apply_snapshot([card('Downtown', 2), card('Uptown', 5)])
+
+    diff = store.apply_snapshot([card('Uptown', 5), card('Downtown', 2)])
+    assert not diff
+
+def test_duplicate_card_change_is_reported_once():
+    store = InventoryStore()
+    store.apply_snapshot([card('Downtown', 2), card('Uptown', 5)])
+
+    diff = store.apply_snapshot([card('Uptown', 6), card('Downtown', 2)])
+    assert [change.new for change in diff.changed] == [card('Uptown', 6)]
+    assert diff.restocked == [card('Uptown', 6)]
+    assert not diff.added and not diff.removed
+
+def test_remaining_duplicate_keeps_its_key():
+    store = InventoryStore()
+    store.apply_snapshot([card('Downtown', 2), card('Uptown', 5)])
+
+    diff = store.apply_snapshot([card('Uptown', 5)])
+    assert diff.removed == [card('Downtown', 2)]
+    assert not diff.added and not diff.changed
+    assert not store.apply_snapshot([card('Uptown', 5)])
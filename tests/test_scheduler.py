@@ -0,0 +1,45 @@
+from datetime import datetime, time
+import pytest
+from scheduler import AdaptivePolicy, ScrapeTarget, parse_drop_windows, parse_targets
+
+# 2024-01-05 is a Friday
+FRIDAY = datetime(2024, 1, 5)
+
+def at(day_offset, hour, minute=0):
+    return FRIDAY.replace(day=FRIDAY.day + day_offset, hour=hour, minute=minute)
+
+def test_parses_unpadded_times():
+    [window] = parse_drop_windows('Mon,Thu@9:00-11:30')
+    assert window.weekdays == {0, 3}
+    assert (window.start, window.end) == (time(9, 0), time(11, 30))
+
+def test_unpadded_window_matches():
+    policy = AdaptivePolicy(drop_windows=parse_drop_windows('9:00-11:00'))
+    assert policy.in_drop_window(at(0, 9, 30))
+    assert policy.in_drop_window(at(0, 10, 59))
+    assert not policy.in_drop_window(at(0, 11))
+    assert not policy.in_drop_window(at(0, 8, 59))
+
+def test_window_past_midnight():
+    policy = AdaptivePolicy(drop_windows=parse_drop_windows('Fri@22:00-02:00'))
+    assert policy.in_drop_window(at(0, 23))
+    assert policy.in_drop_window(at(1, 1, 59))  # Saturday morning
+    assert not policy.in_drop_window(at(1, 2))
+    assert not policy.in_drop_window(at(0, 1))  # Friday morning belongs to Thursday's window
+    assert not policy.in_drop_window(at(1, 23))
+
+@pytest.mark.parametrize('windows', ['9-11', '25:00-26:00', 'Fri@10:00', 'Fri@10:00-10:00', 'Funday@10:00-11:00'])
+def test_rejects_bad_windows(windows):
+    with pytest.raises(ValueError):
+        parse_drop_windows(windows)
+
+def test_parses_targets():
+    assert parse_targets(' a=http://a.test/ , b=http://b.test/|30|5 ') == [
+        ScrapeTarget('a', 'http://a.test/', 75, 15),
+        ScrapeTarget('b', 'http://b.test/', 30.0, 5.0),
+    ]
+
+@pytest.mark.parametrize('targets', ['http://a.test/', 'a=', 'a=http://a.test/|soon', 'a=http://a.test/|30|5|1', 'a=http://a.test/|-5'])
+def test_rejects_bad_targets(targets):
+    with pytest.raises(ValueError):
+        parse_targets(targets)
@@ -0,0 +1,28 @@
+import os
+import stat
+import pytest
+from storage import write_file_atomic
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="POSIX file modes")
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def test_new_file_gets_umask_permissions(tmp_path):
+    umask = os.umask(0)
+    os.umask(umask)
+    path = str(tmp_path / 'whiskey_data.json')
+    write_file_atomic(path, '[]')
+    assert mode(path) == 0o666 & ~umask
+    assert open(path).read() == '[]'
+
+def test_existing_file_keeps_its_mode(tmp_path):
+    path = str(tmp_path / 'whiskey_data.json')
+    with open(path, 'w') as f:
+        f.write('old')
+    os.chmod(path, 0o640)
+
+    write_file_atomic(path, 'new')
+    assert mode(path) == 0o640
+    assert open(path).read() == 'new'
+    assert os.listdir(tmp_path) == ['whiskey_data.json']
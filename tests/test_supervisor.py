@@ -0,0 +1,127 @@
+import requests
+import pytest
+from fixture_server import FaultInjectingHandler, FaultPlan, start_fixture_server
+from supervisor import Backoff, FetchSupervisor, build_identities
+
+RELEASE_PATH = '/whiskey-release/whiskey-release'
+RELEASE_PAGE = "<html><body><div class='card_title_name'>Weller 12 Year</div></body></html>"
+
+class PageSession:
+    """Plain HTTP session for an identity, returning any 200 page like the browser would."""
+
+    created = 0
+
+    def __init__(self, identity):
+        PageSession.created += 1
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = identity.user_agent
+        self.last_failure = None
+
+    def fetch(self, url):
+        try:
+            response = self.session.get(url, timeout=5)
+        except requests.RequestException:
+            self.last_failure = 'error'
+            return None
+        if response.status_code != 200:
+            self.last_failure = f'http_{response.status_code}'
+            return None
+        return response.text
+
+    def close(self):
+        self.session.close()
+
+@pytest.fixture
+def serve(tmp_path):
+    (tmp_path / 'whiskey_page.html').write_text(RELEASE_PAGE)
+    servers = []
+
+    def start(faults=(), blocked_agents=()):
+        plan = FaultPlan(faults, blocked_agents=blocked_agents)
+        server, base_url = start_fixture_server(str(tmp_path), handler_class=FaultInjectingHandler, fault_plan=plan)
+        servers.append(server)
+        return plan, base_url + RELEASE_PATH
+
+    PageSession.created = 0
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+class FixedBackoff(Backoff):
+    """Backoff without the jitter, so tests know how long a wait lasts."""
+
+    def delay(self, attempt):
+        return self.cap
+
+def no_wait():
+    return FixedBackoff(base=0, cap=0)
+
+def supervisor(identities, **options):
+    options.setdefault('breaker_backoff', no_wait())
+    options.setdefault('quarantine_backoff', no_wait())
+    return FetchSupervisor(PageSession, identities, **options)
+
+def test_empty_listing_is_confirmed_once_and_kept(serve):
+    _, url = serve(['empty'] * 9 + ['ok'])
+    session = supervisor(build_identities()).session()
+
+    results = [session.fetch(url) for _ in range(10)]
+    assert results[:2] == [None, None]
+    assert all(result is not None and 'card_title_name' not in result for result in results[2:9])
+    assert 'card_title_name' in results[9]
+    assert PageSession.created == 1
+
+def test_empty_listing_is_retried_as_the_next_identity(serve):
+    _, url = serve(['empty', 'ok'])
+    identities = build_identities(['AgentA', 'AgentB'])
+    session = supervisor(identities).session()
+
+    assert session.fetch(url) is None
+    assert session.last_failure == 'empty'
+    assert 'card_title_name' in session.fetch(url)
+    assert list(session.sessions) == [identities[1]]  # The first identity's session was closed
+    assert PageSession.created == 2
+
+def test_worker_keeps_its_identity_while_fetches_succeed(serve):
+    _, url = serve()
+    identities = build_identities(['AgentA', 'AgentB', 'AgentC'])
+    supervised = supervisor(identities)
+    first, second = supervised.session(), supervised.session()
+
+    for _ in range(5):
+        assert 'card_title_name' in first.fetch(url)
+        assert 'card_title_name' in second.fetch(url)
+    assert list(first.sessions) == [identities[0]]
+    assert list(second.sessions) == [identities[1]]
+    assert PageSession.created == 2
+
+def test_blocked_identity_is_quarantined_and_rotated(serve):
+    _, url = serve(blocked_agents=['BadBot'])
+    supervised = supervisor(build_identities(['BadBot/1.0', 'GoodBot/1.0']),
+                            quarantine_backoff=FixedBackoff(cap=600))
+    session = supervised.session()
+
+    assert session.fetch(url) is None
+    assert session.last_failure == 'http_403'
+    assert 'card_title_name' in session.fetch(url)
+    assert list(supervised.pool.quarantined()) == ['identity-1']
+
+def test_breaker_opens_after_repeated_failures(serve):
+    plan, url = serve(['500', '500', 'ok'])
+    session = supervisor(build_identities(), failure_threshold=2,
+                         breaker_backoff=FixedBackoff(cap=600)).session()
+
+    assert session.fetch(url) is None
+    assert session.fetch(url) is None
+    assert session.fetch(url) is None
+    assert session.last_failure == 'circuit_open'
+    assert len(plan.served) == 2
+
+def test_connection_reset_is_a_failure(serve):
+    _, url = serve(['reset', 'ok'])
+    session = supervisor(build_identities()).session()
+
+    assert session.fetch(url) is None
+    assert session.last_failure == 'error'
+    assert 'card_title_name' in session.fetch(url)